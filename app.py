@@ -1,11 +1,25 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, stream_template, request, jsonify, session, redirect, url_for
 from functools import wraps
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
 import random
 import logging
 import os
-from sqlalchemy import inspect
-from tool_set_processor import populate_db_from_excel
+import sys
+import click
+from sqlalchemy import inspect, select, func, tuple_
+from sqlalchemy.orm import contains_eager
+from tool_set_processor import (populate_db_from_excel, sync_db_from_excel, import_workbooks,
+                                format_stats, format_sync_summary, TOOLSET_PATH)
 from models import db, Theme, Subtheme, Category, Name, NameCategory
+from data_version import bump_version
+from pool_metrics import InstrumentedQueuePool, pool_stats
+from request_metrics import init_request_metrics, render_prometheus
+from lazy_dashboard import LazyDashboard
+from hierarchy import get_hierarchy
+from migrations import upgrade_schema
+from rollups import LINK_COLUMNS, RollupSnapshot, update_rollups, ensure_rollups, rebuild_rollups
+from upsert import insert_ignore, delete_returning
+from batching import chunked
 
 logging.basicConfig(level=logging.INFO)  # Add basic logging
 
@@ -13,21 +27,43 @@ app = Flask(__name__)
 app.secret_key = 'your-secret-key'  # Replace with a secure key
 
 # Import database configuration
-from config import DATABASE_URL
+from config import (DATABASE_URL, SQLALCHEMY_ENGINE_OPTIONS, REQUEST_METRICS,
+                    DASHBOARD_WARM_UP)
+
+# Upper bound for /api/random_name?n=
+RANDOM_NAME_MAX_BATCH = 100
+
+# Page sizes for /api/names/query
+NAME_QUERY_PAGE_SIZE = 50
+NAME_QUERY_MAX_PAGE_SIZE = 500
+
+# Admin matrix window sizes: names per page and category columns per window
+MATRIX_PAGE_SIZE = 100
+MATRIX_MAX_PAGE_SIZE = 500
+MATRIX_CATEGORY_WINDOW = 40
+MATRIX_MAX_CATEGORY_WINDOW = 200
 
 # Configure SQLAlchemy
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(SQLALCHEMY_ENGINE_OPTIONS, poolclass=InstrumentedQueuePool)
 
 # Now initialize db with the app
 db.init_app(app)
 
+if REQUEST_METRICS:
+    init_request_metrics(app)
+
 # Function to Create Tables
 def create_tables(app_instance):
     with app_instance.app_context():
         logging.info("Inside app_context, attempting db.create_all()...")
         try:
             db.create_all()
+            # create_all() skips indexes declared after a table already existed
+            upgrade_schema()
+            if rows := ensure_rollups():
+                logging.info(f"Built {rows} hierarchy rollup rows.")
             logging.info("db.create_all() executed.")
             inspector = inspect(db.engine)
             if inspector.has_table("themes"):
@@ -42,7 +78,7 @@ logging.info("Calling create_tables function...")
 create_tables(app)
 logging.info("Finished calling create_tables function.")
 
-# Populate Database from Excel
+# Populate Database from Excel (skipped when the import manifest shows tool_set.xlsx is unchanged)
 logging.info("Calling populate_db_from_excel function...")
 try:
     populate_db_from_excel(app)
@@ -50,14 +86,48 @@ try:
 except Exception as e:
     logging.error(f"Error during database population: {e}", exc_info=True)
 
-# Import and Initialize Dash App
-logging.info("Importing and initializing Dash app...")
-from dashboard import get_dash_app
-try:
-    dash_app = get_dash_app(app)  # Pass the Flask app instance
-    logging.info("Dash app initialized.")
-except Exception as e:
-    logging.error(f"Error during Dash app initialization: {e}", exc_info=True)
+@app.cli.command('import-toolset')
+@click.option('--path', 'paths', multiple=True, default=[TOOLSET_PATH], show_default=True,
+              help='Workbook to import; repeat to import several at once.')
+@click.option('--stream', is_flag=True, help='Read the sheet row by row (bounded memory for large workbooks).')
+@click.option('--all-sheets', is_flag=True, help='Import every sheet instead of only the first.')
+@click.option('--workers', type=click.IntRange(min=1), help='Parser processes for several sheets (default: one per core).')
+def import_toolset_command(paths, stream, all_sheets, workers):
+    """Force a re-import of the tool set workbook(s), ignoring the import manifest."""
+    if len(paths) == 1 and not all_sheets:
+        stats = populate_db_from_excel(app, path=paths[0], force=True, stream=stream)
+    else:
+        # several sheets: parsed in parallel, always with the streaming parser
+        stats = import_workbooks(app, list(paths), all_sheets=all_sheets, workers=workers)
+    if stats is None:
+        raise click.ClickException(f"Import of {', '.join(paths)} failed, see log for details.")
+    click.echo(format_stats(stats))
+
+@app.cli.command('sync-toolset')
+@click.option('--path', default=TOOLSET_PATH, show_default=True, help='Workbook to sync from.')
+@click.option('--dry-run', is_flag=True, help='Only print what would change.')
+@click.option('--prune', is_flag=True, help='Also delete names and hierarchy rows missing from the workbook.')
+@click.option('--stream', is_flag=True, help='Read the sheet row by row (bounded memory for large workbooks).')
+def sync_toolset_command(path, dry_run, prune, stream):
+    """Sync links with the workbook, inserting and deleting only what changed."""
+    summary = sync_db_from_excel(app, path=path, dry_run=dry_run, prune=prune, stream=stream)
+    if summary is None:
+        raise click.ClickException(f"Sync with {path} failed, see log for details.")
+    click.echo(f"{'Dry run: ' if dry_run else ''}{format_sync_summary(summary)}")
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the dashboard rollup counts from name_categories."""
+    rows = rebuild_rollups()
+    bump_version()
+    db.session.commit()
+    click.echo(f"Rebuilt {rows} hierarchy rollup rows.")
+
+# Mount the Dash app at /dashboard; it is built on first hit (or by the warm-up thread)
+dashboard_app = LazyDashboard(app)
+app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {'/dashboard': dashboard_app})
+if DASHBOARD_WARM_UP:
+    dashboard_app.warm_up()
 
 # Login required decorator
 def login_required(f):
@@ -80,6 +150,15 @@ def index():
         logging.error(f"Error in index route querying themes: {e}", exc_info=True)
         return "Error loading themes. Database might not be ready.", 500
 
+def _hierarchy_response(payload, index):
+    """JSON response tagged with the hierarchy version; answers 304 when the client copy is current."""
+    response = jsonify(payload)
+    response.set_etag(index.etag)
+    # revalidate every time: a 304 is cheap, and an admin edit must show up on the next request
+    response.headers['Cache-Control'] = 'public, no-cache'
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response.make_conditional(request)
+
 @app.route('/api/subthemes')
 def get_subthemes():
     theme_id = request.args.get('theme_id')
@@ -87,13 +166,8 @@ def get_subthemes():
         theme_id = int(theme_id)
     except (TypeError, ValueError):
         return jsonify([])
-    subthemes = Subtheme.query.filter_by(theme_id=theme_id).all()
-    response = jsonify([
-        {'id': s.id, 'name': f"{s.theme.name} - {s.name}"}
-        for s in subthemes
-    ])
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    return response
+    index = get_hierarchy()
+    return _hierarchy_response(index.subtheme_options(theme_id), index)
 
 @app.route('/api/categories')
 def get_categories():
@@ -102,30 +176,105 @@ def get_categories():
         subtheme_id = int(subtheme_id)
     except (TypeError, ValueError):
         return jsonify([])
-    categories = Category.query.filter_by(subtheme_id=subtheme_id).all()
-    response = jsonify([
-        {'id': c.id, 'name': f"{c.subtheme.theme.name} - {c.subtheme.name} - {c.name}"}
-        for c in categories
-    ])
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    return response
+    index = get_hierarchy()
+    return _hierarchy_response(index.category_options(subtheme_id), index)
+
+def _draw_name_ids(name_ids, n, seed):
+    """Picks up to ``n`` distinct ids in O(n), reproducibly when a seed is given."""
+    rng = random.Random(seed) if seed is not None else random
+    if n == 1:
+        return [rng.choice(name_ids)]
+    return [name_ids[i] for i in rng.sample(range(len(name_ids)), min(n, len(name_ids)))]
 
 @app.route('/api/random_name')
 def get_random_name():
-    category_id = request.args.get('category_id')
-    category = Category.query.get(category_id)
-    if category and category.names:
-        random_name = random.choice(category.names)
-        count = len(category.names)
-        response = jsonify({'name': random_name.name, 'count': count, 
-                        'theme': category.subtheme.theme.name, 
-                        'subtheme': category.subtheme.name, 
-                        'category': category.name})
+    try:
+        category_id = int(request.args.get('category_id'))
+    except (TypeError, ValueError):
+        category_id = None
+    batch = 'n' in request.args
+    try:
+        n = int(request.args.get('n', 1))
+    except ValueError:
+        n = 0
+    if not 1 <= n <= RANDOM_NAME_MAX_BATCH:
+        return jsonify({'status': 'error', 'message': f'n must be between 1 and {RANDOM_NAME_MAX_BATCH}'}), 400
+    seed = request.args.get('seed')
+
+    index = get_hierarchy()
+    path = index.path(category_id)
+    name_ids = index.name_ids(category_id)
+    names = []
+    if path and name_ids:
+        drawn = _draw_name_ids(name_ids, n, seed)
+        lookup = dict(db.session.execute(select(Name.id, Name.name).where(Name.id.in_(drawn))).all())
+        names = [lookup[i] for i in drawn if i in lookup]
+    if names:
+        theme_name, subtheme_name, category_name = path
+        payload = {'name': names[0], 'count': len(name_ids), 
+                   'theme': theme_name, 
+                   'subtheme': subtheme_name, 
+                   'category': category_name}
+        if batch:
+            payload['names'] = names
     else:
-        response = jsonify({'name': None, 'count': 0})
+        payload = {'name': None, 'count': 0}
+        if batch:
+            payload['names'] = []
+    if seed is not None:
+        # a seeded draw is reproducible for a given data version, so it can be cached like the hierarchy
+        return _hierarchy_response(payload, index)
+    response = jsonify(payload)
+    # every unseeded draw is different, so never let a cache replay it
+    response.headers['Cache-Control'] = 'no-store'
     response.headers.add('Access-Control-Allow-Origin', '*')
     return response
 
+def _query_terms(arg, levels):
+    """Parses comma-separated or repeated ``level:id`` terms, e.g. ``category:3,theme:1``."""
+    terms = []
+    for value in request.args.getlist(arg):
+        for term in filter(None, (part.strip() for part in value.split(','))):
+            level, _, node_id = term.partition(':')
+            if level not in levels:
+                raise ValueError(f"{arg}: unknown level in '{term}' (use {', '.join(levels)})")
+            try:
+                terms.append((level, int(node_id)))
+            except ValueError:
+                raise ValueError(f"{arg}: '{term}' needs an integer id")
+    return terms
+
+@app.route('/api/names/query')
+def query_names():
+    """Names matching a boolean set query over categories, subthemes and themes.
+
+    A name matches when it is under every ``all`` term, under at least one ``any``
+    term (if any are given) and under no ``none`` term; a subtheme or theme term
+    covers all of its categories. Matches are counted in full and paged by
+    ``offset``/``limit`` in name id order.
+    """
+    # imported on first use: name_bitmaps needs numpy, which the portal workers otherwise never load
+    from name_bitmaps import LEVELS, get_name_bitmaps
+    try:
+        all_of, any_of, none_of = (_query_terms(arg, LEVELS) for arg in ('all', 'any', 'none'))
+    except ValueError as ve:
+        return jsonify({'status': 'error', 'message': str(ve)}), 400
+    if not (all_of or any_of or none_of):
+        return jsonify({'status': 'error', 'message': 'Give at least one all, any or none term'}), 400
+    offset = _int_arg('offset', 0, 0, 10**9)
+    limit = _int_arg('limit', NAME_QUERY_PAGE_SIZE, 1, NAME_QUERY_MAX_PAGE_SIZE)
+
+    index = get_name_bitmaps()
+    matches = index.query(all_of, any_of, none_of)
+    count = index.count(matches)
+    return _hierarchy_response({
+        'count': count,
+        'names': [{'id': name_id, 'name': name} for name_id, name in index.page(matches, offset, limit)],
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if offset + limit < count else None,
+    }, index)
+
 # Back Portal Routes
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -146,164 +295,275 @@ def logout():
 @login_required
 def admin():
     themes = Theme.query.order_by(Theme.name).all()
-    subthemes = Subtheme.query.join(Theme).order_by(Theme.name, Subtheme.name).all()
-    categories = Category.query.join(Category.subtheme).join(Subtheme.theme).order_by(Theme.name, Subtheme.name, Category.name).all()
-    names = Name.query.order_by(Name.name).all()
-
-    name_category_map = {}
-    associations = NameCategory.query.all()
-    for assoc in associations:
-        if assoc.name_id not in name_category_map:
-            name_category_map[assoc.name_id] = set()
-        name_category_map[assoc.name_id].add(assoc.category_id)
-
-    theme_spans = {}
-    subtheme_spans = {}
-    for cat in categories:
-        theme_name = cat.subtheme.theme.name
-        subtheme_key = f"{cat.subtheme.theme.name}-{cat.subtheme.name}"
-        theme_spans[theme_name] = theme_spans.get(theme_name, 0) + 1
-        subtheme_spans[subtheme_key] = subtheme_spans.get(subtheme_key, 0) + 1
-
-    return render_template(
+    subthemes = (Subtheme.query.join(Theme)
+                 .options(contains_eager(Subtheme.theme))
+                 .order_by(Theme.name, Subtheme.name).all())
+
+    # The names x categories matrix itself is fetched window by window from /admin/api/matrix
+    return app.response_class(stream_template(
         'admin.html',
         themes=themes,
-        subthemes=subthemes,
-        categories=categories,
-        names=names,
-        name_category_map=name_category_map,
-        theme_spans=theme_spans,
-        subtheme_spans=subtheme_spans
-    )
+        subthemes=subthemes
+    ))
+
+def _int_arg(name, default, low, high):
+    try:
+        value = int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(low, min(value, high))
+
+@app.route('/admin/api/matrix')
+@login_required
+def admin_matrix():
+    """One window of the names x categories matrix.
+
+    Names are keyset-paginated on Name.name (``after`` is the last name of the
+    previous page) and optionally narrowed by a case-insensitive prefix ``q``;
+    categories are windowed by ``cat_offset``/``cat_limit`` in display order.
+    """
+    after = request.args.get('after')
+    search = request.args.get('q', '').strip().lower()
+    limit = _int_arg('limit', MATRIX_PAGE_SIZE, 1, MATRIX_MAX_PAGE_SIZE)
+    cat_offset = _int_arg('cat_offset', 0, 0, 10**9)
+    cat_limit = _int_arg('cat_limit', MATRIX_CATEGORY_WINDOW, 1, MATRIX_MAX_CATEGORY_WINDOW)
+
+    name_query = select(Name.id, Name.name)
+    if search:
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        name_query = name_query.where(func.lower(Name.name).like(f"{escaped}%", escape='\\'))
+    total = db.session.execute(select(func.count()).select_from(name_query.subquery())).scalar() if after is None else None
+    if after is not None:
+        name_query = name_query.where(Name.name > after)
+    names = db.session.execute(name_query.order_by(Name.name).limit(limit + 1)).all()
+    has_more = len(names) > limit
+    names = names[:limit]
+
+    category_total = db.session.query(func.count(Category.id)).scalar()
+    categories = db.session.execute(
+        select(Category.id, Category.name, Subtheme.name.label('subtheme'), Theme.name.label('theme'))
+        .join(Category.subtheme).join(Subtheme.theme)
+        .order_by(Theme.name, Subtheme.name, Category.name, Category.id)
+        .offset(cat_offset).limit(cat_limit)
+    ).all()
+
+    checked = {}
+    if names and categories:
+        links = db.session.execute(
+            select(NameCategory.name_id, NameCategory.category_id)
+            .where(NameCategory.name_id.in_([n.id for n in names]))
+            .where(NameCategory.category_id.in_([c.id for c in categories]))
+        )
+        for name_id, category_id in links:
+            checked.setdefault(name_id, []).append(category_id)
+
+    return jsonify({
+        'names': [{'id': n.id, 'name': n.name, 'checked': checked.get(n.id, [])} for n in names],
+        'next_after': names[-1].name if has_more else None,
+        'total': total,
+        'categories': [
+            {'id': c.id, 'name': c.name, 'subtheme': c.subtheme, 'theme': c.theme}
+            for c in categories
+        ],
+        'category_offset': cat_offset,
+        'category_total': category_total,
+    })
+
+def _pair_filter(pairs):
+    return tuple_(NameCategory.name_id, NameCategory.category_id).in_(pairs)
+
+def _flush_toggles(toggles):
+    """Applies buffered (name_id, category_id, checked, result) toggles with one lookup,
+    one bulk insert and one bulk delete per chunk.
+
+    When the same pair is toggled more than once, the last toggle wins. Each toggle's
+    ``result`` is 'success' only if the flush moved its pair to its state, else 'ignored'.
+    Returns the ((name_id, category_id), checked) changes actually made.
+    """
+    desired = {}
+    for name_id, category_id, checked, _ in toggles:
+        desired[(name_id, category_id)] = checked
+    existing = set()
+    for chunk in chunked(desired):
+        existing.update(db.session.execute(
+            select(NameCategory.name_id, NameCategory.category_id)
+            .where(_pair_filter(chunk))).all())
+    to_insert = [pair for pair, checked in desired.items() if checked and pair not in existing]
+    to_delete = [pair for pair, checked in desired.items() if not checked and pair in existing]
+    snapshot = RollupSnapshot(n for n, _ in to_insert + to_delete)
+    # ON CONFLICT DO NOTHING keeps a concurrent toggle of the same pair from failing the batch;
+    # RETURNING tells which rows this batch changed, as the lookup may be stale by now
+    inserted = insert_ignore(NameCategory, [{'name_id': n, 'category_id': c} for n, c in to_insert],
+                             ['name_id', 'category_id'], returning=LINK_COLUMNS)
+    deleted = []
+    for chunk in chunked(to_delete):
+        deleted.extend(delete_returning(NameCategory, _pair_filter(chunk), LINK_COLUMNS))
+    update_rollups(snapshot, added=inserted, removed=deleted)
+    logging.info(f"Applied toggles: {len(inserted)} associations added, {len(deleted)} removed, "
+                 f"{len(desired) - len(inserted) - len(deleted)} unchanged")
+    changes = [(tuple(pair), True) for pair in inserted] + [(tuple(pair), False) for pair in deleted]
+    made = set(changes)
+    last = {(name_id, category_id): result for name_id, category_id, _, result in toggles}
+    for name_id, category_id, checked, result in toggles:
+        if last[(name_id, category_id)] is not result:
+            result.update(status='ignored', message='Superseded by a later toggle')
+        elif ((name_id, category_id), checked) in made:
+            result['status'] = 'success'
+        else:
+            result.update(status='ignored',
+                          message='Association already exists' if checked else 'Association not found')
+    toggles.clear()
+    return changes
+
+def _parse_toggle(data):
+    name_id = data.get('name_id')
+    category_id = data.get('category_id')
+    checked = data.get('checked')
+
+    if name_id is None or category_id is None or checked is None:
+        raise ValueError("Missing data for toggle action")
+    try:
+        return int(name_id), int(category_id), bool(checked)
+    except (TypeError, ValueError):
+        raise ValueError("name_id and category_id must be integers")
+
+def _apply_action(data):
+    """Applies one non-toggle admin action inside the caller's transaction and returns its result."""
+    action_type = data.get('type')
+    response_data = {'status': 'success'}
+    logging.info(f"Admin update action: {action_type} with data: {data}")
+
+    if action_type == 'add_theme':
+        name = data.get('name', '').strip()
+        if not name: raise ValueError("Theme name cannot be empty")
+        if insert_ignore(Theme, [{'name': name}], ['name']):
+            new_id = db.session.execute(select(Theme.id).filter_by(name=name)).scalar_one()
+            response_data['new_id'] = new_id
+            logging.info(f"Added Theme: {name} (ID: {new_id})")
+        else:
+            response_data['status'] = 'ignored'
+            response_data['message'] = 'Theme already exists'
+            logging.info(f"Theme already exists: {name}")
+
+
+    elif action_type == 'add_subtheme':
+        name = data.get('name', '').strip()
+        theme_id = data.get('theme_id')
+        if not name or theme_id is None: raise ValueError("Subtheme name or theme_id missing")
+        if insert_ignore(Subtheme, [{'theme_id': theme_id, 'name': name}], ['theme_id', 'name']):
+            new_id = db.session.execute(select(Subtheme.id).filter_by(theme_id=theme_id, name=name)).scalar_one()
+            response_data['new_id'] = new_id
+            logging.info(f"Added Subtheme: {name} to Theme ID {theme_id} (ID: {new_id})")
+        else:
+            response_data['status'] = 'ignored'
+            response_data['message'] = 'Subtheme already exists for this theme'
+            logging.info(f"Subtheme already exists: {name} for Theme ID {theme_id}")
+
+    elif action_type == 'add_category':
+        name = data.get('name', '').strip()
+        subtheme_id = data.get('subtheme_id')
+        if not name or subtheme_id is None: raise ValueError("Category name or subtheme_id missing")
+        if insert_ignore(Category, [{'subtheme_id': subtheme_id, 'name': name}], ['subtheme_id', 'name']):
+            new_id = db.session.execute(select(Category.id).filter_by(subtheme_id=subtheme_id, name=name)).scalar_one()
+            response_data['new_id'] = new_id
+            logging.info(f"Added Category: {name} to Subtheme ID {subtheme_id} (ID: {new_id})")
+        else:
+            response_data['status'] = 'ignored'
+            response_data['message'] = 'Category already exists for this subtheme'
+            logging.info(f"Category already exists: {name} for Subtheme ID {subtheme_id}")
+
+    elif action_type == 'add_name':
+        name = data.get('name', '').strip()
+        if not name: raise ValueError("Name cannot be empty")
+        if insert_ignore(Name, [{'name': name}], ['name']):
+            new_id = db.session.execute(select(Name.id).filter_by(name=name)).scalar_one()
+            response_data['new_id'] = new_id
+            logging.info(f"Added Name: {name} (ID: {new_id})")
+        else:
+            response_data['status'] = 'ignored'
+            response_data['message'] = 'Name already exists'
+            logging.info(f"Name already exists: {name}")
+
+    elif action_type == 'delete_name':
+        name_id = data.get('name_id')
+        if name_id is None: raise ValueError("Missing name_id for delete action")
+        
+        # 1. Delete associations first
+        snapshot = RollupSnapshot([name_id])
+        links = delete_returning(NameCategory, NameCategory.name_id == name_id, LINK_COLUMNS)
+        update_rollups(snapshot, removed=links)
+        logging.info(f"Deleted associations for Name ID: {name_id}")
+
+        # 2. Delete the name itself
+        name_to_delete = db.session.query(Name).get(name_id)
+        if name_to_delete:
+            db.session.delete(name_to_delete)
+            logging.info(f"Deleted Name: {name_to_delete.name} (ID: {name_id})")
+        else:
+            logging.warning(f"Name ID {name_id} not found for deletion.")
+            response_data['status'] = 'ignored'
+            response_data['message'] = 'Name not found'
+
+    else:
+        raise ValueError(f"Unknown action type: {action_type}")
+
+    return response_data
 
 @app.route('/admin/update', methods=['POST'])
 @login_required
 def update_data():
-    data = request.json
-    response_data = {'status': 'success'} # Prepare response data
+    """Applies one admin action, or a batch of them in a single transaction.
 
+    A batch is ``{"actions": [...]}`` (or a bare JSON list). Toggles are
+    buffered and written in bulk; other actions flush pending toggles first so
+    the batch keeps its order. Any invalid action rolls back the whole batch.
+    """
+    data = request.json
+    if isinstance(data, list):
+        actions, batch = data, True
+    elif isinstance(data, dict) and 'actions' in data:
+        actions, batch = data['actions'], True
+    else:
+        actions, batch = [data or {}], False
+    if not isinstance(actions, list) or not all(isinstance(a, dict) for a in actions):
+        return jsonify({'status': 'error', 'message': 'actions must be a list of objects'}), 400
+    if not batch and 'type' not in actions[0]:
+        return jsonify({'status': 'success'})
+
+    results = []
+    changes = []
+    position = None
     try:
         # Use db.session.begin() for the outer transaction management
-        with db.session.begin(): 
-            if 'type' in data:
-                action_type = data.get('type')
-                logging.info(f"Admin update action: {action_type} with data: {data}")
-
-                if action_type == 'toggle':
-                    name_id = data.get('name_id')
-                    category_id = data.get('category_id')
-                    checked = data.get('checked')
-
-                    if name_id is None or category_id is None or checked is None:
-                        raise ValueError("Missing data for toggle action")
-
-                    assoc = db.session.query(NameCategory).filter_by(name_id=name_id, category_id=category_id).first()
-
-                    if checked:
-                        if not assoc:
-                            new_assoc = NameCategory(name_id=name_id, category_id=category_id)
-                            db.session.add(new_assoc)
-                            logging.info(f"Added association: Name ID {name_id}, Category ID {category_id}")
-                        else:
-                            logging.info(f"Association already exists: Name ID {name_id}, Category ID {category_id}")
-                    else:
-                        if assoc:
-                            db.session.delete(assoc)
-                            logging.info(f"Deleted association: Name ID {name_id}, Category ID {category_id}")
-                        else:
-                            logging.info(f"Association not found for deletion: Name ID {name_id}, Category ID {category_id}")
-
-                elif action_type == 'add_theme':
-                    name = data.get('name', '').strip()
-                    if not name: raise ValueError("Theme name cannot be empty")
-                    existing = db.session.query(Theme).filter_by(name=name).first()
-                    if not existing:
-                        new_theme = Theme(name=name)
-                        db.session.add(new_theme)
-                        db.session.flush() # Flush to get ID if needed
-                        response_data['new_id'] = new_theme.id
-                        logging.info(f"Added Theme: {name} (ID: {new_theme.id})")
-                    else:
-                        response_data['status'] = 'ignored'
-                        response_data['message'] = 'Theme already exists'
-                        logging.info(f"Theme already exists: {name}")
-
-
-                elif action_type == 'add_subtheme':
-                    name = data.get('name', '').strip()
-                    theme_id = data.get('theme_id')
-                    if not name or theme_id is None: raise ValueError("Subtheme name or theme_id missing")
-                    existing = db.session.query(Subtheme).filter_by(theme_id=theme_id, name=name).first()
-                    if not existing:
-                        new_subtheme = Subtheme(theme_id=theme_id, name=name)
-                        db.session.add(new_subtheme)
-                        db.session.flush()
-                        response_data['new_id'] = new_subtheme.id
-                        logging.info(f"Added Subtheme: {name} to Theme ID {theme_id} (ID: {new_subtheme.id})")
-                    else:
-                        response_data['status'] = 'ignored'
-                        response_data['message'] = 'Subtheme already exists for this theme'
-                        logging.info(f"Subtheme already exists: {name} for Theme ID {theme_id}")
-
-                elif action_type == 'add_category':
-                    name = data.get('name', '').strip()
-                    subtheme_id = data.get('subtheme_id')
-                    if not name or subtheme_id is None: raise ValueError("Category name or subtheme_id missing")
-                    existing = db.session.query(Category).filter_by(subtheme_id=subtheme_id, name=name).first()
-                    if not existing:
-                        new_category = Category(subtheme_id=subtheme_id, name=name)
-                        db.session.add(new_category)
-                        db.session.flush()
-                        response_data['new_id'] = new_category.id
-                        logging.info(f"Added Category: {name} to Subtheme ID {subtheme_id} (ID: {new_category.id})")
-                    else:
-                        response_data['status'] = 'ignored'
-                        response_data['message'] = 'Category already exists for this subtheme'
-                        logging.info(f"Category already exists: {name} for Subtheme ID {subtheme_id}")
-
-                elif action_type == 'add_name':
-                    name = data.get('name', '').strip()
-                    if not name: raise ValueError("Name cannot be empty")
-                    existing = db.session.query(Name).filter_by(name=name).first()
-                    if not existing:
-                        new_name = Name(name=name)
-                        db.session.add(new_name)
-                        db.session.flush()
-                        response_data['new_id'] = new_name.id
-                        logging.info(f"Added Name: {name} (ID: {new_name.id})")
-                    else:
-                        response_data['status'] = 'ignored'
-                        response_data['message'] = 'Name already exists'
-                        logging.info(f"Name already exists: {name}")
-
-                elif action_type == 'delete_name':
-                    name_id = data.get('name_id')
-                    if name_id is None: raise ValueError("Missing name_id for delete action")
-                    
-                    # 1. Delete associations first
-                    db.session.query(NameCategory).filter_by(name_id=name_id).delete()
-                    logging.info(f"Deleted associations for Name ID: {name_id}")
-
-                    # 2. Delete the name itself
-                    name_to_delete = db.session.query(Name).get(name_id)
-                    if name_to_delete:
-                        db.session.delete(name_to_delete)
-                        logging.info(f"Deleted Name: {name_to_delete.name} (ID: {name_id})")
-                    else:
-                        logging.warning(f"Name ID {name_id} not found for deletion.")
-                        response_data['status'] = 'ignored'
-                        response_data['message'] = 'Name not found'
-                
+        with db.session.begin():
+            toggles = []
+            for position, action in enumerate(actions):
+                if action.get('type') == 'toggle':
+                    # filled in by the flush, from the rows it actually changed
+                    results.append({})
+                    toggles.append((*_parse_toggle(action), results[-1]))
                 else:
-                     raise ValueError(f"Unknown action type: {action_type}")
+                    changes.extend(_flush_toggles(toggles))
+                    results.append(_apply_action(action))
+            changes.extend(_flush_toggles(toggles))
+
+            if any(result['status'] != 'ignored' for result in results):
+                bump_version()  # invalidate dashboard read caches in every worker
 
         # The 'with db.session.begin():' block handles commit/rollback automatically
-        logging.info("Admin update transaction completed successfully.")
+        logging.info(f"Admin update transaction completed successfully ({len(actions)} action(s)).")
+        # a toggle-only batch moves this worker's name bitmaps forward instead of forcing a rebuild;
+        # a worker that never answered /api/names/query has no index to move
+        name_bitmaps = sys.modules.get('name_bitmaps')
+        if name_bitmaps and changes and all(action.get('type') == 'toggle' for action in actions):
+            name_bitmaps.apply_toggles(changes)
 
     except ValueError as ve:
         # Rollback is handled automatically by exiting the 'with' block on error
         logging.error(f"Validation error during admin update: {ve}")
         response_data = {'status': 'error', 'message': str(ve)}
+        if batch:
+            response_data['index'] = position
         return jsonify(response_data), 400 # Bad request
     except Exception as e:
         # Rollback is handled automatically by exiting the 'with' block on error
@@ -311,12 +571,29 @@ def update_data():
         response_data = {'status': 'error', 'message': 'An internal error occurred.'}
         return jsonify(response_data), 500 # Internal server error
 
-    return jsonify(response_data)
+    if batch:
+        return jsonify({'status': 'success', 'results': results})
+    return jsonify(results[0])
 
 @app.route('/_health')
 def health_check():
     return "OK", 200
 
+@app.route('/_pool')
+def pool_metrics():
+    return jsonify(pool_stats(db.engine))
+
+@app.route('/_cache')
+def cache_metrics():
+    # None until the dashboard has been loaded in this worker
+    return jsonify({'figures': dashboard_app.figure_cache_stats()})
+
+@app.route('/_metrics')
+def prometheus_metrics():
+    # request/SQL series are only populated when REQUEST_METRICS is on
+    body = render_prometheus(pool=pool_stats(db.engine), figure_cache=dashboard_app.figure_cache_stats())
+    return body, 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""
+Chunking for statements that bind parameters per item: multi-row inserts,
+IN lists and tuple IN lists over (name_id, category_id) pairs. Every writer
+and lookup batches through chunked(), so one BATCH_SIZE bounds them all.
+"""
+from itertools import islice
+
+# items per statement; at three bound columns per item this stays well under the
+# bind-parameter limits (32766 on SQLite >= 3.32, 65535 on PostgreSQL and MySQL)
+BATCH_SIZE = 1000
+
+def chunked(items, size=BATCH_SIZE):
+    """Yields lists of at most ``size`` items; lazy, so generators are consumed one batch at a time."""
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
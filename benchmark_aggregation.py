@@ -0,0 +1,132 @@
+"""
+Dashboard aggregation benchmark.
+
+Synthesizes a hierarchy with --rows association rows (1M by default) held in
+memory, and times what one update_charts call spends aggregating, for
+representative filter selections, along three paths:
+
+  legacy  the per-row pandas frame the dashboard used to build: isin filters,
+          then separate groupbys for the bar chart, the pie chart, the treemap,
+          the sunburst (px.sunburst grouped the raw rows itself) and a nunique
+          for the top-10 table
+  rows    fact_table_from_rows: one bincount pass over the rows' triple codes,
+          then the FactTable.aggregate stage
+  rollup  FactTable.aggregate alone, on the per-triple counts the dashboard
+          reads from hierarchy_rollups
+
+Every path's results are checked against the legacy ones before timing.
+Results (p50/p95 per path and the speedup over legacy) are printed as JSON.
+
+    python benchmark_aggregation.py --rows 1000000 --names 200000 --categories 400
+"""
+import argparse
+import json
+import random
+
+import numpy as np
+import pandas as pd
+
+from benchmark_common import hierarchy_triples, latency_summary, selections, timed
+from dashboard import LEVELS, FactTable
+
+def synthetic_rows(rows, names, categories, themes=3, subthemes=24, seed=0):
+    """Returns (triples, name codes, triple codes) for ``rows`` distinct name/category links."""
+    rng = np.random.default_rng(seed)
+    rows = min(rows, names * categories)
+    triples = pd.DataFrame(hierarchy_triples(categories, themes, subthemes), columns=list(LEVELS))
+    links = np.empty(0, dtype=np.int64)
+    while len(links) < rows:
+        drawn = rng.integers(0, names * categories, size=rows - len(links))
+        links = np.union1d(links, drawn)
+    links = rng.permutation(links)[:rows]
+    return triples, links // categories, links % categories
+
+def fact_table_from_rows(triples, row_triple, name_count):
+    """Builds a FactTable from one triple code per association row, in a single bincount pass."""
+    return FactTable(triples, np.bincount(row_triple, minlength=len(triples)), name_count)
+
+def legacy_frame(triples, name_codes, triple_codes):
+    """The per-link Theme/Subtheme/Category/Name frame the old dashboard filtered and grouped."""
+    frame = triples.iloc[triple_codes].reset_index(drop=True)
+    # object columns, like the frame built from the ORM query results
+    return frame.assign(Name=pd.Series(name_codes + 1).astype(str)).astype(object)
+
+def legacy_aggregate(data, themes, subthemes, categories):
+    if themes:
+        data = data[data['Theme'].isin(themes)]
+    if subthemes:
+        data = data[data['Subtheme'].isin(subthemes)]
+    if categories:
+        data = data[data['Category'].isin(categories)]
+    path = list(LEVELS)
+    return {
+        'by_category': data.groupby('Category').size().reset_index(name='Count'),
+        'by_theme': data.groupby('Theme').size().reset_index(name='Count'),
+        'tree': data.groupby(path).size().reset_index(name='Count'),
+        'sunburst': data.groupby(path).size(),
+        'summary': data.groupby(path).agg(Name_Count=pd.NamedAgg(column='Name', aggfunc='nunique')).reset_index(),
+    }
+
+def _as_dict(frame, key):
+    return {tuple(row[:-1]): int(row[-1]) for row in frame[[*key, frame.columns[-1]]].itertuples(index=False)}
+
+def check(legacy, stage):
+    path = list(LEVELS)
+    assert _as_dict(legacy['by_category'], ['Category']) == _as_dict(stage['by_category'], ['Category'])
+    assert _as_dict(legacy['by_theme'], ['Theme']) == _as_dict(stage['by_theme'], ['Theme'])
+    assert _as_dict(legacy['tree'], path) == _as_dict(stage['tree'][path + ['Count']], path)
+    assert _as_dict(legacy['summary'], path) == _as_dict(stage['tree'][path + ['Name_Count']], path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Association rows to synthesize.')
+    parser.add_argument('--names', type=int, default=200_000)
+    parser.add_argument('--categories', type=int, default=400)
+    parser.add_argument('--themes', type=int, default=3)
+    parser.add_argument('--subthemes', type=int, default=24)
+    parser.add_argument('--selections', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5, help='Passes over the selections per path.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Also write the JSON results to this file.')
+    args = parser.parse_args()
+
+    triples, name_codes, triple_codes = synthetic_rows(args.rows, args.names, args.categories,
+                                                       args.themes, args.subthemes, args.seed)
+    name_count = len(np.unique(name_codes))
+    data = legacy_frame(triples, name_codes, triple_codes)
+    facts = fact_table_from_rows(triples, triple_codes, name_count)
+    picks = selections(facts, random.Random(args.seed), args.selections)
+
+    def stage(table, pick):
+        _, themes, subthemes, categories = pick
+        return table.aggregate(table.triple_mask(themes, subthemes, categories))
+
+    paths = {
+        'legacy': lambda pick: legacy_aggregate(data, *pick[1:]),
+        'rows': lambda pick: stage(fact_table_from_rows(triples, triple_codes, name_count), pick),
+        'rollup': lambda pick: stage(facts, pick),
+    }
+    for pick in picks:
+        legacy = paths['legacy'](pick)
+        check(legacy, paths['rows'](pick))
+        check(legacy, paths['rollup'](pick))
+
+    latency = {path: latency_summary([timed(fn, pick)[1] for _ in range(args.repeat) for pick in picks])
+               for path, fn in paths.items()}
+    legacy_p50 = latency['legacy']['p50_ms']
+    report = {
+        'rows': len(data),
+        'names': name_count,
+        'categories': len(triples),
+        'latency': latency,
+        'speedup_p50': {path: round(legacy_p50 / max(latency[path]['p50_ms'], 1e-3), 1)
+                        for path in ('rows', 'rollup')},
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+
+if __name__ == '__main__':
+    main()
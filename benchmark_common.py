@@ -0,0 +1,48 @@
+"""
+Helpers shared by the benchmark scripts: the synthetic hierarchy layout, filter
+selections, and timing and latency summaries.
+"""
+import time
+
+import numpy as np
+
+def hierarchy_triples(categories, themes=3, subthemes=24):
+    """(Theme, Subtheme, Category) labels for ``categories`` columns, split evenly
+    into at most ``subthemes`` subthemes and those into at most ``themes`` themes."""
+    subthemes = max(1, min(subthemes, categories))
+    themes = max(1, min(themes, subthemes))
+    triples = []
+    for col in range(categories):
+        sub = col * subthemes // categories
+        triples.append((f"T{sub * themes // subthemes}", f"S{sub}", f"C{col}"))
+    return triples
+
+def selections(facts, rng, count):
+    """Representative (label, themes, subthemes, categories) filter selections over a FactTable."""
+    themes = facts.labels['Theme']
+    categories = facts.labels['Category']
+    picked = [('none', None, None, None)]
+    while len(picked) < count:
+        theme = rng.choice(themes)
+        subthemes = facts.present_labels('Subtheme', facts.triple_mask(themes=[theme]))
+        kind = len(picked) % 3
+        if kind == 0:
+            picked.append(('theme', [theme], None, None))
+        elif kind == 1:
+            picked.append(('theme+subtheme', [theme], [rng.choice(subthemes)], None))
+        else:
+            picked.append(('categories', None, None, rng.sample(categories, min(3, len(categories)))))
+    return picked
+
+def timed(fn, *args):
+    """Calls ``fn(*args)`` and returns (its result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def latency_summary(samples):
+    """p50/p95 in milliseconds of the given samples in seconds."""
+    ms = np.asarray(samples) * 1000
+    return {'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(ms, 95)), 3),
+            'samples': len(ms)}
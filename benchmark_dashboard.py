@@ -0,0 +1,185 @@
+"""
+Dashboard callback latency benchmark.
+
+Seeds synthetic hierarchies at several scales (names x categories x link
+density), mounts the dashboard with dashboard.get_dash_app() and drives its
+server-side callbacks through Dash's update endpoint with representative filter
+selections (the dropdown cascade runs clientside, so only the hierarchy store
+it reads is measured). For every scale it reports p50/p95 latency per callback, the time
+split between loading the fact table, aggregation and Plotly figure building,
+the tracemalloc peak of each phase, and the chart callback's response size for a
+first render and for a patched update. Results are printed as JSON.
+
+The benchmark DROPS AND RECREATES the tables of --database, so only ever point
+it at a scratch database.
+
+    python benchmark_dashboard.py --scales 1000x50x0.05,20000x300x0.03 --repeat 30
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import tracemalloc
+
+import numpy as np
+from flask import Flask
+
+import dashboard
+import data_version
+from benchmark_common import hierarchy_triples, latency_summary, selections, timed
+from dashboard import build_charts, figure_cache, get_dash_app, load_fact_table, serialize_outputs
+from data_version import bump_version
+from models import db
+from tool_set_processor import BulkImporter
+
+DEFAULT_SCALES = '1000x50x0.05,10000x200x0.05,50000x400x0.02'
+
+def parse_scale(text):
+    names, categories, density = text.lower().split('x')
+    return int(names), int(categories), float(density)
+
+def synthetic_matrix(names, categories, density, themes=3, subthemes=24, seed=0):
+    """Returns (triples, pairs) linking each name to each category with probability ``density``."""
+    rng = np.random.default_rng(seed)
+    triples = hierarchy_triples(categories, themes, subthemes)
+    pairs = set()
+    for triple in triples:
+        members = rng.choice(names, size=rng.binomial(names, density), replace=False)
+        pairs.update((str(name + 1), triple) for name in members)
+    return triples, pairs
+
+def seed_database(triples, pairs):
+    db.drop_all()
+    db.create_all()
+    BulkImporter(db.session).run(triples, pairs)
+    bump_version()
+    db.session.commit()
+    # every scale restarts the version counter at 1, so drop the in-process caches too
+    dashboard._read_model.clear()
+    data_version._state.update(version=None, checked_at=0.0)
+    figure_cache.clear()
+
+class DashClient:
+    """Posts callback requests to the dashboard server's _dash-update-component endpoint."""
+
+    def __init__(self, dash_server):
+        self.client = dash_server.test_client()
+        self.dependencies = self.client.get('/_dash-dependencies').get_json()
+
+    def call(self, first_output, inputs, state, changed):
+        dependency = next(d for d in self.dependencies if d['output'].lstrip('.').startswith(first_output))
+        outputs = [dict(zip(('id', 'property'), o.split('.')))
+                   for o in dependency['output'].strip('.').split('...')]
+        body = {
+            'output': dependency['output'],
+            'outputs': outputs if len(outputs) > 1 else outputs[0],
+            'inputs': [dict(i, value=v) for i, v in zip(dependency['inputs'], inputs)],
+            'state': [dict(s, value=v) for s, v in zip(dependency['state'], state)],
+            'changedPropIds': changed,
+        }
+        response = self.client.post('/_dash-update-component', json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{first_output} callback failed with {response.status_code}")
+        return response
+
+def _peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def bench_scale(client, repeat, rng):
+    facts = load_fact_table()
+    picks = selections(facts, rng, 10)
+
+    def aggregate(pick):
+        _, themes, subthemes, categories = pick
+        facts.aggregate(facts.triple_mask(themes, subthemes, categories))
+
+    def figures(pick):
+        _, themes, subthemes, categories = pick
+        serialize_outputs(build_charts(facts, themes, subthemes, categories))
+
+    def charts_callback(pick, chart_mode=None):
+        _, themes, subthemes, categories = pick
+        return client.call('bar-chart', [themes, subthemes, categories, None, None],
+                           [themes, subthemes, categories, chart_mode], ['theme-dropdown.value'])
+
+    def patched_charts(pick):
+        charts_callback(pick, 'compact')
+
+    def hierarchy_callback(pick):
+        client.call('hierarchy', [None], [], ['data-version.data'])
+
+    def uncached_charts(pick):
+        figure_cache.clear()
+        charts_callback(pick)
+
+    phases = {
+        'load': lambda pick: load_fact_table(),
+        'aggregation': aggregate,
+        'figures': figures,
+        'update_charts': uncached_charts,
+        'update_charts_cached': charts_callback,
+        'update_charts_patched': patched_charts,
+        'update_hierarchy_store': hierarchy_callback,
+    }
+    latency, memory = {}, {}
+    for phase, fn in phases.items():
+        for pick in picks:  # warm up (and fill the figure cache for the cached phase)
+            fn(pick)
+        latency[phase] = latency_summary([timed(fn, pick)[1] for _ in range(repeat) for pick in picks])
+        memory[phase] = _peak_kib(lambda: [fn(pick) for pick in picks])
+
+    # figures include their own aggregation, so Plotly time is the difference of the medians
+    load, agg, fig = (latency[p]['p50_ms'] for p in ('load', 'aggregation', 'figures'))
+    split = {'load_ms': load, 'aggregation_ms': agg, 'plotly_ms': round(max(fig - agg, 0.0), 3)}
+    payload = {'patched' if mode else 'full':
+               sum(len(charts_callback(pick, mode).get_data()) for pick in picks) // len(picks)
+               for mode in (None, 'compact')}
+    return {'links': len(facts), 'latency': latency, 'split_p50': split, 'peak_memory_kib': memory,
+            'mean_payload_bytes': payload}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help='Comma-separated NAMESxCATEGORIESxDENSITY scales.')
+    parser.add_argument('--themes', type=int, default=3)
+    parser.add_argument('--subthemes', type=int, default=24)
+    parser.add_argument('--repeat', type=int, default=20, help='Passes over the selections per phase.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', help='Scratch database URL; defaults to a temporary SQLite file.')
+    parser.add_argument('--output', help='Also write the JSON results to this file.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = Flask(__name__)
+        server.config['SQLALCHEMY_DATABASE_URI'] = args.database or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        server.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(server)
+        results = []
+        with server.app_context():
+            db.create_all()
+            client = DashClient(get_dash_app(server).server)
+            for scale in args.scales.split(','):
+                names, categories, density = parse_scale(scale)
+                triples, pairs = synthetic_matrix(names, categories, density,
+                                                  args.themes, args.subthemes, args.seed)
+                _, seed_s = timed(seed_database, triples, pairs)
+                result = bench_scale(client, args.repeat, random.Random(args.seed))
+                results.append({'names': names, 'categories': categories, 'density': density,
+                                'seed_s': round(seed_s, 3), **result})
+            db.session.remove()
+            db.engine.dispose()
+
+    output = json.dumps({'results': results}, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+
+if __name__ == '__main__':
+    main()
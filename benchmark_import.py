@@ -0,0 +1,155 @@
+"""
+Import benchmark for tool_set_processor.
+
+Generates a synthetic workbook in the tool_set.xlsx layout (three header rows:
+theme, subtheme, category; names in column A; 'x' marks membership) and times
+the parse, resolve and write phases of an import against one or more databases.
+Each database gets a cold pass (empty tables) and a warm pass (everything
+already imported). Results are printed as JSON.
+
+The benchmark DROPS AND RECREATES the tables of every --database it is given,
+so only ever point it at a scratch database.
+
+    python benchmark_import.py --names 20000 --categories 300 --density 0.05 \\
+        --database sqlite:////tmp/bench.db \\
+        --database postgresql://localhost/tool_set_bench --profile cprofile
+"""
+import argparse
+import cProfile
+import json
+import os
+import random
+import tempfile
+
+import openpyxl
+from flask import Flask
+
+from benchmark_common import hierarchy_triples, timed
+from models import db
+from tool_set_processor import BulkImporter, read_toolset_matrix, stream_toolset_matrix
+
+def generate_workbook(path, names, categories, density, themes=3, subthemes=24, seed=0):
+    """Writes a names × categories workbook where each cell is marked with probability ``density``."""
+    rng = random.Random(seed)
+    theme_row, subtheme_row, category_row = zip(*hierarchy_triples(categories, themes, subthemes))
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append([None, *theme_row])
+    sheet.append([None, *subtheme_row])
+    sheet.append(['name', *category_row])
+    for name in range(1, names + 1):
+        sheet.append([name] + ['x' if rng.random() < density else None for _ in range(categories)])
+    workbook.save(path)
+
+def _bench_app(database_url):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def _parse_stream(path):
+    triples, pairs = stream_toolset_matrix(path)
+    return triples, set(pairs)
+
+def run_pass(path, parser):
+    """Runs one import inside the current app context and returns its phase timings."""
+    parse = read_toolset_matrix if parser == 'dense' else _parse_stream
+    (triples, pairs), parse_s = timed(parse, path)
+    importer = BulkImporter(db.session)
+
+    def resolve():
+        category_ids = importer.resolve_categories(triples)
+        name_ids = importer.resolve_names(sorted({name for name, _ in pairs}))
+        return category_ids, name_ids
+    (category_ids, name_ids), resolve_s = timed(resolve)
+
+    def write():
+        importer.write_associations(
+            (name_ids[name], category_ids[triple]) for name, triple in pairs)
+        db.session.commit()
+    _, write_s = timed(write)
+    return {
+        'parse_s': round(parse_s, 4),
+        'resolve_s': round(resolve_s, 4),
+        'write_s': round(write_s, 4),
+        'total_s': round(parse_s + resolve_s + write_s, 4),
+        'associations': len(pairs),
+        'stats': importer.stats,
+    }
+
+def run_benchmark(path, database_urls, parsers):
+    results = []
+    for url in database_urls:
+        app = _bench_app(url)
+        with app.app_context():
+            dialect = db.engine.dialect.name
+            for parser in parsers:
+                db.drop_all()
+                db.create_all()
+                for label in ('cold', 'warm'):
+                    timings = run_pass(path, parser)
+                    results.append({'database': dialect, 'parser': parser, 'pass': label, **timings})
+            db.session.remove()
+            db.engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--names', type=int, default=5000)
+    parser.add_argument('--categories', type=int, default=200)
+    parser.add_argument('--density', type=float, default=0.05, help='Probability that a cell is marked.')
+    parser.add_argument('--themes', type=int, default=3)
+    parser.add_argument('--subthemes', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workbook', help='Benchmark this workbook instead of generating one.')
+    parser.add_argument('--database', action='append', dest='databases',
+                        help='Scratch database URL (repeatable); defaults to a temporary SQLite file.')
+    parser.add_argument('--parser', choices=('dense', 'stream', 'both'), default='both')
+    parser.add_argument('--profile', choices=('cprofile', 'pyinstrument'))
+    parser.add_argument('--profile-out', default='import_profile',
+                        help='Profile output path, without extension.')
+    parser.add_argument('--output', help='Also write the JSON results to this file.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.workbook
+        if path is None:
+            path = os.path.join(tmp, 'bench.xlsx')
+            _, generate_s = timed(generate_workbook, path, args.names, args.categories,
+                                   args.density, args.themes, args.subthemes, args.seed)
+        databases = args.databases or [f"sqlite:///{os.path.join(tmp, 'bench.db')}"]
+        parsers = ('dense', 'stream') if args.parser == 'both' else (args.parser,)
+
+        if args.profile == 'cprofile':
+            profiler = cProfile.Profile()
+            results = profiler.runcall(run_benchmark, path, databases, parsers)
+            profiler.dump_stats(f"{args.profile_out}.prof")
+        elif args.profile == 'pyinstrument':
+            from pyinstrument import Profiler  # optional, not in requirements.txt
+            profiler = Profiler()
+            with profiler:
+                results = run_benchmark(path, databases, parsers)
+            with open(f"{args.profile_out}.html", 'w') as fh:
+                fh.write(profiler.output_html())
+        else:
+            results = run_benchmark(path, databases, parsers)
+
+        report = {
+            'workbook': {
+                'path': args.workbook or 'generated',
+                'size_bytes': os.path.getsize(path),
+                **({} if args.workbook else {
+                    'names': args.names, 'categories': args.categories,
+                    'density': args.density, 'generate_s': round(generate_s, 4)}),
+            },
+            'results': results,
+        }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+
+if __name__ == '__main__':
+    main()
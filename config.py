@@ -15,3 +15,36 @@ if postgres_url:
 else:
     # Use SQLite for local development - easier than MySQL
     DATABASE_URL = sqlite_uri
+
+# Seconds a worker trusts its last read of the shared data version before re-checking the database
+DATA_VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "1.0"))
+
+# Connection pool settings, shared by Flask-SQLAlchemy and the Dash dashboard (one pool per worker)
+def _env_flag(name, default):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': int(os.getenv("DB_POOL_SIZE", "5")),
+    'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", "5")),
+    'pool_timeout': float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    'pool_recycle': int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    'pool_pre_ping': _env_flag("DB_POOL_PRE_PING", "true"),
+}
+
+# Dashboard figure cache bounds: max cached filter selections and seconds before an entry expires
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", "256"))
+FIGURE_CACHE_TTL = float(os.getenv("FIGURE_CACHE_TTL", "600"))
+
+# Build the dashboard in a background thread at startup instead of on its first request
+DASHBOARD_WARM_UP = _env_flag("DASHBOARD_WARM_UP", "false")
+
+# Seconds between the dashboard's background read-model refreshes (0 disables the thread),
+# and between the browser's data version polls
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "5"))
+DASHBOARD_POLL_SECONDS = float(os.getenv("DASHBOARD_POLL_SECONDS", "10"))
+
+# Send the dashboard charts as template-free columnar figures, patched in place on filter changes
+DASHBOARD_COMPACT_FIGURES = _env_flag("DASHBOARD_COMPACT_FIGURES", "true")
+
+# Opt-in per-endpoint latency, SQL statement count and DB time series on /_metrics
+REQUEST_METRICS = _env_flag("REQUEST_METRICS", "false")
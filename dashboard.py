@@ -1,29 +1,156 @@
 import dash
-from dash import dcc, html
+from dash import Patch, dcc, html
 from dash.dependencies import Input, Output, State
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
-from sqlalchemy import create_engine, func, text
+from sqlalchemy import func, text
 import numpy as np
-from config import DATABASE_URL
-
-# Function to load data from database
-def load_data():
-    engine = create_engine(DATABASE_URL)
-    themes_df = pd.read_sql('SELECT * FROM themes', engine)
-    subthemes_df = pd.read_sql('SELECT * FROM subthemes', engine)
-    categories_df = pd.read_sql('SELECT * FROM categories', engine)
-    names_df = pd.read_sql('SELECT * FROM names', engine)
-    name_categories_df = pd.read_sql('SELECT * FROM name_categories', engine)
-    merged_df = name_categories_df.merge(names_df, left_on='name_id', right_on='id', suffixes=('_nc', '_name'))
-    merged_df = merged_df.merge(categories_df, left_on='category_id', right_on='id', suffixes=('_name', '_cat'))
-    merged_df = merged_df.merge(subthemes_df, left_on='subtheme_id', right_on='id', suffixes=('_cat', '_sub'))
-    merged_df = merged_df.merge(themes_df, left_on='theme_id', right_on='id', suffixes=('_sub', '_theme'))
-    data = merged_df[['name_name', 'name_cat', 'name_sub', 'name_theme']]
-    data.columns = ['Name', 'Category', 'Subtheme', 'Theme']
-    return data, themes_df, subthemes_df, categories_df, names_df, name_categories_df
+import logging
+import threading
+from flask import Flask
+from models import db
+from data_version import VersionedCache
+from ttl_cache import TTLCache
+from request_metrics import init_request_metrics
+from config import (FIGURE_CACHE_SIZE, FIGURE_CACHE_TTL, DASHBOARD_REFRESH_SECONDS, DASHBOARD_POLL_SECONDS,
+                    DASHBOARD_COMPACT_FIGURES, REQUEST_METRICS)
+
+LEVELS = ('Theme', 'Subtheme', 'Category')
+
+class FactTable:
+    """Category-level facts for dashboard filtering, read from the hierarchy rollups.
+
+    Each row is one distinct (Theme, Subtheme, Category) label triple weighted
+    by its link count, with every label integer-coded per level. Filters are
+    boolean masks over the triples and every aggregate is a weighted bincount,
+    so nothing here grows with the number of name/category associations.
+    """
+
+    def __init__(self, triples, triple_counts, name_count):
+        self.triples = triples.reset_index(drop=True)
+        self.codes = {}
+        self.labels = {}
+        self.lookup = {}
+        for level in LEVELS:
+            codes, uniques = pd.factorize(self.triples[level])
+            self.codes[level] = codes.astype(np.int32)
+            self.labels[level] = list(uniques)
+            self.lookup[level] = {label: code for code, label in enumerate(uniques)}
+        self.triple_counts = np.asarray(triple_counts, dtype=np.int64)
+        # a category links each name at most once, so its link count is its name count
+        self.triple_names = self.triple_counts
+        self.name_count = int(name_count)
+
+    def __len__(self):
+        return int(self.triple_counts.sum())
+
+    def triple_mask(self, themes=None, subthemes=None, categories=None):
+        """Boolean mask over triples with associations that match every given label filter."""
+        mask = self.triple_counts > 0
+        for level, selected in zip(LEVELS, (themes, subthemes, categories)):
+            if selected:
+                wanted = [self.lookup[level][v] for v in selected if v in self.lookup[level]]
+                mask &= np.isin(self.codes[level], wanted)
+        return mask
+
+    def present_labels(self, level, mask):
+        """Labels of ``level`` that occur in the masked triples, in first-seen order."""
+        codes = self.codes[level][mask]
+        _, first = np.unique(codes, return_index=True)
+        return [self.labels[level][c] for c in codes[np.sort(first)]]
+
+    def hierarchy_codes(self):
+        """Compact JSON hierarchy: labels per level and the present triples as label-code rows."""
+        mask = self.triple_mask()
+        return {
+            'labels': {level: self.labels[level] for level in LEVELS},
+            'triples': np.column_stack([self.codes[level][mask] for level in LEVELS]).tolist(),
+        }
+
+    def aggregate(self, mask):
+        """The aggregation stage feeding every chart and the top-10 table.
+
+        Counts are computed once at the finest grain, per (Theme, Subtheme,
+        Category) triple; the per-category and per-theme rollups are weighted
+        bincounts of those few hundred triple counts.
+        """
+        counts = np.where(mask, self.triple_counts, 0)
+        tree = self.triples[mask].assign(Count=counts[mask], Name_Count=self.triple_names[mask])
+        rollups = {}
+        for level in ('Category', 'Theme'):
+            totals = np.bincount(self.codes[level], weights=counts, minlength=len(self.labels[level]))
+            rollups[level] = pd.DataFrame({level: self.labels[level],
+                                           'Count': totals.astype(np.int64)}).query('Count > 0')
+        return {
+            'total': int(counts.sum()),
+            'tree': tree,
+            'by_category': rollups['Category'],
+            'by_theme': rollups['Theme'],
+        }
+
+# Function to load data from database (shares the Flask-SQLAlchemy pool; needs an app context)
+def load_fact_table():
+    engine = db.engine
+    # one row per category with a complete hierarchy, in category id order
+    categories_df = pd.read_sql(
+        """
+        SELECT t.name AS "Theme", s.name AS "Subtheme", c.name AS "Category",
+               COALESCE(r.link_count, 0) AS link_count
+        FROM categories c
+        JOIN subthemes s ON s.id = c.subtheme_id
+        JOIN themes t ON t.id = s.theme_id
+        LEFT JOIN hierarchy_rollups r ON r.level = 'category' AND r.node_id = c.id
+        ORDER BY c.id
+        """, engine)
+    totals = pd.read_sql("SELECT name_count FROM hierarchy_rollups WHERE level = 'total'", engine)
+
+    # categories sharing a label triple are merged (first-seen order)
+    triples = categories_df.groupby(list(LEVELS), sort=False, as_index=False)['link_count'].sum()
+    name_count = int(totals['name_count'].sum()) if len(totals) else 0
+    return FactTable(triples[list(LEVELS)], triples['link_count'].to_numpy(np.int64), name_count)
+
+def _build_read_model(version):
+    facts = load_fact_table()
+    facts.version = version
+    return facts
+
+# Shared read model: the fact table, reloaded only when the data version moves
+_read_model = VersionedCache(_build_read_model)
+
+def get_read_model():
+    """Returns the cached FactTable for the current data version."""
+    return _read_model.get()
+
+# Background refresher: keeps the read model current so callbacks never wait on the database
+_refresher = {'thread': None, 'stop': threading.Event()}
+
+def start_refresher(main_app, interval=DASHBOARD_REFRESH_SECONDS):
+    """Starts a daemon thread that reloads the read model whenever the data version moves."""
+    if _refresher['thread'] is not None or interval <= 0:
+        return
+    def run():
+        while not _refresher['stop'].wait(interval):
+            try:
+                with main_app.app_context():
+                    get_read_model()
+            except Exception as e:
+                logging.error(f"Error refreshing dashboard read model: {e}", exc_info=True)
+    _refresher['thread'] = threading.Thread(target=run, name='dashboard-refresher', daemon=True)
+    _refresher['thread'].start()
+
+def latest_read_model(main_app):
+    """The read model as last refreshed. Loads synchronously only before the first load,
+    or when no refresher is running."""
+    facts = _read_model.peek()
+    if facts is None or _refresher['thread'] is None:
+        with main_app.app_context():
+            facts = get_read_model()
+    return facts
+
+# Rendered chart outputs keyed by (themes, subthemes, categories, data version)
+figure_cache = TTLCache(maxsize=FIGURE_CACHE_SIZE, ttl=FIGURE_CACHE_TTL)
 
 # Create a color palette for consistent visualization
 COLORS = {
@@ -39,6 +166,10 @@ COLORS = {
     'text': '#333333'        # Dark Gray
 }
 
+# px's 'Blues' continuous scale, spelled out for the compact treemap
+BLUES = [[i / (len(px.colors.sequential.Blues) - 1), color]
+         for i, color in enumerate(px.colors.sequential.Blues)]
+
 # Custom theme for Plotly
 custom_theme = {
     'layout': {
@@ -55,10 +186,19 @@ custom_theme = {
 # Initialize Dash app variable
 dash_app = None
 
-# Define the layout to be used in get_dash_app()
-def create_layout():
-    data, themes_df, subthemes_df, categories_df, names_df, name_categories_df = load_data()
+# Define the layout to be used in get_dash_app(); Dash calls it on every page load
+def create_layout(main_app):
+    facts = latest_read_model(main_app)
+    everything = facts.triple_mask()
     return html.Div([
+        # Data version of the read model; polled so KPIs and charts follow writes
+        dcc.Store(id='data-version', data=facts.version),
+        dcc.Interval(id='data-version-poll', interval=int(DASHBOARD_POLL_SECONDS * 1000)),
+        # Compact hierarchy for the clientside dropdown cascade
+        dcc.Store(id='hierarchy', data=facts.hierarchy_codes()),
+        # 'compact' once the browser shows full compact figures, which later updates patch
+        dcc.Store(id='chart-mode'),
+
         # Navbar
         html.Nav([
             html.Div([
@@ -96,7 +236,7 @@ def create_layout():
                             html.I(className='fas fa-layer-group fa-2x text-primary'),
                             html.Div([
                                 html.H5('Total Themes', className='card-title mb-0'),
-                                html.H2(f"{len(data['Theme'].unique())}", className='fs-1 fw-bold text-primary')
+                                html.H2(f"{len(facts.present_labels('Theme', everything))}", id='kpi-themes', className='fs-1 fw-bold text-primary')
                             ], className='ms-3')
                         ], className='d-flex align-items-center')
                     ], className='card-body')
@@ -109,7 +249,7 @@ def create_layout():
                             html.I(className='fas fa-sitemap fa-2x text-success'),
                             html.Div([
                                 html.H5('Total Subthemes', className='card-title mb-0'),
-                                html.H2(f"{len(data['Subtheme'].unique())}", className='fs-1 fw-bold text-success')
+                                html.H2(f"{len(facts.present_labels('Subtheme', everything))}", id='kpi-subthemes', className='fs-1 fw-bold text-success')
                             ], className='ms-3')
                         ], className='d-flex align-items-center')
                     ], className='card-body')
@@ -122,7 +262,7 @@ def create_layout():
                             html.I(className='fas fa-tags fa-2x text-warning'),
                             html.Div([
                                 html.H5('Total Categories', className='card-title mb-0'),
-                                html.H2(f"{len(data['Category'].unique())}", className='fs-1 fw-bold text-warning')
+                                html.H2(f"{len(facts.present_labels('Category', everything))}", id='kpi-categories', className='fs-1 fw-bold text-warning')
                             ], className='ms-3')
                         ], className='d-flex align-items-center')
                     ], className='card-body')
@@ -135,7 +275,7 @@ def create_layout():
                             html.I(className='fas fa-file-alt fa-2x text-info'),
                             html.Div([
                                 html.H5('Total Names', className='card-title mb-0'),
-                                html.H2(f"{data['Name'].nunique()}", className='fs-1 fw-bold text-info')
+                                html.H2(f"{facts.name_count}", id='kpi-names', className='fs-1 fw-bold text-info')
                             ], className='ms-3')
                         ], className='d-flex align-items-center')
                     ], className='card-body')
@@ -154,7 +294,7 @@ def create_layout():
                                 html.Label('Theme', className='form-label fw-bold'),
                                 dcc.Dropdown(
                                     id='theme-dropdown',
-                                    options=[{'label': theme, 'value': theme} for theme in data['Theme'].unique()],
+                                    options=[{'label': theme, 'value': theme} for theme in facts.present_labels('Theme', everything)],
                                     placeholder='Select Theme(s)',
                                     multi=True,
                                     className='mb-3',
@@ -165,7 +305,7 @@ def create_layout():
                                 html.Label('Subtheme', className='form-label fw-bold'),
                                 dcc.Dropdown(
                                     id='subtheme-dropdown',
-                                    options=[{'label': sub, 'value': sub} for sub in data['Subtheme'].unique()],
+                                    options=[{'label': sub, 'value': sub} for sub in facts.present_labels('Subtheme', everything)],
                                     placeholder='Select Subtheme(s)',
                                     multi=True,
                                     className='mb-3',
@@ -176,7 +316,7 @@ def create_layout():
                                 html.Label('Category', className='form-label fw-bold'),
                                 dcc.Dropdown(
                                     id='category-dropdown',
-                                    options=[{'label': cat, 'value': cat} for cat in data['Category'].unique()],
+                                    options=[{'label': cat, 'value': cat} for cat in facts.present_labels('Category', everything)],
                                     placeholder='Select Category(s)',
                                     multi=True,
                                     className='mb-3',
@@ -273,11 +413,404 @@ def create_layout():
         )
     ])
 
+def build_charts(facts, selected_themes=None, selected_subthemes=None, selected_categories=None,
+                 compact=DASHBOARD_COMPACT_FIGURES):
+    """Builds the bar, pie, treemap and sunburst figures plus the top-10 table for a selection.
+
+    With ``compact`` the figures are plain dicts without a template (see compact_figures)."""
+    # Filter on triple codes and aggregate in one pass
+    mask = facts.triple_mask(selected_themes, selected_subthemes, selected_categories)
+    aggregates = facts.aggregate(mask)
+        
+    if aggregates['total'] == 0:
+        # Create empty figures if no data
+        empty_message = "No data matches the selected filters. Try adjusting your selections."
+        empty_layout = go.Layout(
+            title=empty_message,
+            font={'size': 16},
+            xaxis={'visible': False},
+            yaxis={'visible': False},
+            plot_bgcolor=COLORS['light'],
+            paper_bgcolor=COLORS['background'],
+            height=350
+        )
+        
+        if compact:
+            empty_fig = {'data': [], 'layout': empty_layout.to_plotly_json()}
+        else:
+            empty_fig = go.Figure(layout=empty_layout)
+        empty_table = html.Div([
+            html.P(empty_message, className='text-center text-muted py-5')
+        ])
+        
+        return empty_fig, empty_fig, empty_fig, empty_fig, empty_table
+
+    figures = compact_figures(aggregates) if compact else plotly_figures(aggregates)
+    return (*figures, summary_table(aggregates['tree']))
+
+def plotly_figures(aggregates):
+    """The bar, pie, treemap and sunburst as full Plotly figures on the plotly_white template."""
+    # ------------------- Bar Chart -------------------
+    bar_data = aggregates['by_category'].sort_values('Count', ascending=False, kind='stable').head(15)  # Top 15 for readability
+    
+    bar_fig = go.Figure()
+    bar_fig.add_trace(go.Bar(
+        x=bar_data['Category'],
+        y=bar_data['Count'],
+        marker_color=COLORS['primary'],
+        hovertemplate='<b>%{x}</b><br>Count: %{y}<extra></extra>'
+    ))
+    
+    bar_fig.update_layout(
+        title={
+            'text': f'Top {len(bar_data)} Categories by Name Count',
+            'y': 0.95,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top'
+        },
+        xaxis_title='',
+        yaxis_title='Number of Names',
+        xaxis={'tickangle': -45},
+        template='plotly_white',
+        height=400,
+        margin={'t': 80, 'l': 50, 'r': 20, 'b': 100}
+    )
+    
+    # ------------------- Pie Chart -------------------
+    pie_data = aggregates['by_theme'].sort_values('Theme')
+    
+    pie_fig = go.Figure()
+    pie_fig.add_trace(go.Pie(
+        labels=pie_data['Theme'],
+        values=pie_data['Count'],
+        hole=0.4,
+        textinfo='percent+label',
+        insidetextorientation='radial',
+        marker=dict(
+            colors=px.colors.qualitative.Pastel,
+            line=dict(color='white', width=2)
+        ),
+        hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>'
+    ))
+    
+    pie_fig.update_layout(
+        title={
+            'text': 'Name Distribution by Theme',
+            'y': 0.95,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top'
+        },
+        template='plotly_white',
+        legend_title_text='Themes',
+        height=400,
+        margin={'t': 80, 'l': 20, 'r': 20, 'b': 20}
+    )
+    
+    # ------------------- Treemap Chart (replacing heatmap) -------------------
+    # Group data for treemap
+    tree_data = aggregates['tree']
+    
+    treemap_fig = px.treemap(
+        tree_data, 
+        path=['Theme', 'Subtheme', 'Category'], 
+        values='Count',
+        color='Count',
+        hover_data=['Count'],
+        color_continuous_scale='Blues',
+        color_continuous_midpoint=np.average(tree_data['Count'])
+    )
+    
+    treemap_fig.update_layout(
+        title={
+            'text': 'Category Hierarchy Tree Map',
+            'y': 0.95,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top'
+        },
+        template='plotly_white',
+        height=500,
+        margin={'t': 80, 'l': 20, 'r': 20, 'b': 20}
+    )
+    
+    # ------------------- Sunburst Chart -------------------
+    sunburst_fig = px.sunburst(
+        tree_data, 
+        path=['Theme', 'Subtheme', 'Category'],
+        values='Count',
+        color_discrete_sequence=px.colors.qualitative.Pastel,
+        branchvalues='total'
+    )
+    
+    sunburst_fig.update_layout(
+        title={
+            'text': 'Hierarchical View of Categories',
+            'y': 0.95,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top'
+        },
+        template='plotly_white',
+        height=500,
+        margin={'t': 80, 'l': 20, 'r': 20, 'b': 20}
+    )
+    
+    return bar_fig, pie_fig, treemap_fig, sunburst_fig
+
+def hierarchy_nodes(tree_data):
+    """Columnar ids, labels, parents and values of every treemap/sunburst node, leaves first.
+
+    Like px.treemap, a parent's color is the count-weighted mean of its leaves' counts.
+    """
+    leaves = tree_data[list(LEVELS)].assign(Count=tree_data['Count'].to_numpy(np.int64))
+    leaves['Square'] = leaves['Count'] ** 2
+    subthemes = leaves.groupby(['Theme', 'Subtheme'], sort=False, as_index=False)[['Count', 'Square']].sum()
+    themes = leaves.groupby('Theme', sort=False, as_index=False)[['Count', 'Square']].sum()
+    subtheme_ids = subthemes['Theme'] + '/' + subthemes['Subtheme']
+    ids = pd.concat([leaves['Theme'] + '/' + leaves['Subtheme'] + '/' + leaves['Category'],
+                     subtheme_ids, themes['Theme']])
+    parents = pd.concat([leaves['Theme'] + '/' + leaves['Subtheme'], subthemes['Theme'],
+                         pd.Series('', index=themes.index)])
+    labels = pd.concat([leaves['Category'], subthemes['Subtheme'], themes['Theme']])
+    counts = np.concatenate([level['Count'].to_numpy() for level in (leaves, subthemes, themes)])
+    squares = np.concatenate([level['Square'].to_numpy() for level in (leaves, subthemes, themes)])
+    return {
+        'ids': ids.tolist(),
+        'labels': labels.tolist(),
+        'parents': parents.tolist(),
+        'values': counts.tolist(),
+        'colors': (squares / np.maximum(counts, 1)).tolist(),
+    }
+
+def _title(text):
+    return {'text': text, 'y': 0.95, 'x': 0.5, 'xanchor': 'center', 'yanchor': 'top'}
+
+def compact_figures(aggregates):
+    """The same four charts as plain figure dicts: traces carry their data as flat columns
+    (treemap and sunburst as ids/labels/parents/values), and the layout has no template,
+    leaving plotly.js defaults where plotly_white would have shipped ~7 KB per figure."""
+    bar_data = aggregates['by_category'].sort_values('Count', ascending=False, kind='stable').head(15)
+    bar_fig = {
+        'data': [{
+            'type': 'bar',
+            'x': bar_data['Category'].tolist(),
+            'y': bar_data['Count'].tolist(),
+            'marker': {'color': COLORS['primary']},
+            'hovertemplate': '<b>%{x}</b><br>Count: %{y}<extra></extra>',
+        }],
+        'layout': {
+            'title': _title(f'Top {len(bar_data)} Categories by Name Count'),
+            'xaxis': {'tickangle': -45},
+            'yaxis': {'title': {'text': 'Number of Names'}},
+            'height': 400,
+            'margin': {'t': 80, 'l': 50, 'r': 20, 'b': 100},
+        },
+    }
+
+    pie_data = aggregates['by_theme'].sort_values('Theme')
+    pie_fig = {
+        'data': [{
+            'type': 'pie',
+            'labels': pie_data['Theme'].tolist(),
+            'values': pie_data['Count'].tolist(),
+            'hole': 0.4,
+            'textinfo': 'percent+label',
+            'insidetextorientation': 'radial',
+            'marker': {'line': {'color': 'white', 'width': 2}},
+            'hovertemplate': '<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>',
+        }],
+        'layout': {
+            'title': _title('Name Distribution by Theme'),
+            'piecolorway': px.colors.qualitative.Pastel,
+            'legend': {'title': {'text': 'Themes'}},
+            'height': 400,
+            'margin': {'t': 80, 'l': 20, 'r': 20, 'b': 20},
+        },
+    }
+
+    tree_data = aggregates['tree']
+    nodes = hierarchy_nodes(tree_data)
+    hierarchy = {key: nodes[key] for key in ('ids', 'labels', 'parents', 'values')}
+    treemap_fig = {
+        'data': [{
+            'type': 'treemap',
+            **hierarchy,
+            'branchvalues': 'total',
+            'marker': {
+                'colors': nodes['colors'],
+                'colorscale': BLUES,
+                'cmid': float(np.average(tree_data['Count'])),
+                'colorbar': {'title': {'text': 'Count'}},
+                'showscale': True,
+            },
+            'hovertemplate': '<b>%{label}</b><br>Count: %{value}<extra></extra>',
+        }],
+        'layout': {
+            'title': _title('Category Hierarchy Tree Map'),
+            'height': 500,
+            'margin': {'t': 80, 'l': 20, 'r': 20, 'b': 20},
+        },
+    }
+
+    sunburst_fig = {
+        'data': [{
+            'type': 'sunburst',
+            **hierarchy,
+            'branchvalues': 'total',
+            'hovertemplate': '<b>%{label}</b><br>Count: %{value}<extra></extra>',
+        }],
+        'layout': {
+            'title': _title('Hierarchical View of Categories'),
+            'sunburstcolorway': px.colors.qualitative.Pastel,
+            'height': 500,
+            'margin': {'t': 80, 'l': 20, 'r': 20, 'b': 20},
+        },
+    }
+    return bar_fig, pie_fig, treemap_fig, sunburst_fig
+
+# Trace properties that change with the selection; everything else in a compact figure is fixed
+PATCHED_TRACE_KEYS = ('x', 'y', 'labels', 'values', 'ids', 'parents')
+PATCHED_MARKER_KEYS = ('colors', 'cmid')
+
+def patch_outputs(outputs):
+    """Turns full compact outputs into Patch updates of their data and titles only, for a
+    browser that already shows compact figures; non-figure outputs are sent whole."""
+    patched = []
+    for output in outputs:
+        if not isinstance(output, dict) or 'data' not in output:
+            patched.append(output)
+            continue
+        patch = Patch()
+        for i, trace in enumerate(output['data']):
+            for key in PATCHED_TRACE_KEYS:
+                if key in trace:
+                    patch['data'][i][key] = trace[key]
+            for key in PATCHED_MARKER_KEYS:
+                if key in trace.get('marker', {}):
+                    patch['data'][i]['marker'][key] = trace['marker'][key]
+        patch['layout']['title']['text'] = output['layout']['title']['text']
+        patched.append(patch)
+    return tuple(patched)
+
+def summary_table(tree_data):
+    """The top-10 categories by name count as an HTML table."""
+    # Get summary statistics
+    summary = tree_data.sort_values('Name_Count', ascending=False, kind='stable').head(10)
+    
+    # Create table for data overview
+    table = html.Table([
+        # Header
+        html.Thead(
+            html.Tr([
+                html.Th('Theme', className='text-center'),
+                html.Th('Subtheme', className='text-center'),
+                html.Th('Category', className='text-center'),
+                html.Th('Name Count', className='text-center')
+            ], className='table-light')
+        ),
+        # Body
+        html.Tbody([
+            html.Tr([
+                html.Td(row.Theme),
+                html.Td(row.Subtheme),
+                html.Td(row.Category),
+                html.Td(row.Name_Count, className='text-center')
+            ]) for row in summary.itertuples(index=False)
+        ])
+    ], className='table table-striped table-hover table-bordered')
+    
+    # Add a title above the table
+    table_section = html.Div([
+        html.H6('Top 10 Categories by Name Count', className='text-muted mb-3'),
+        table
+    ])
+
+    return table_section
+
+# Clientside cascade: options are the labels present under the selected parents, in
+# first-seen triple order (FactTable.present_labels); a reset clears the selection and
+# the filter, otherwise values no longer offered are dropped.
+_CASCADE_JS = """
+function cascadeOptions(hierarchy, level, filters, reset, current) {
+    const labels = hierarchy.labels;
+    const wanted = filters.map(([filterLevel, selected]) =>
+        [filterLevel, !reset && selected && selected.length ? new Set(selected) : null]);
+    const column = {Theme: 0, Subtheme: 1, Category: 2};
+    const seen = new Set();
+    const options = [];
+    for (const triple of hierarchy.triples) {
+        if (wanted.some(([filterLevel, set]) => set && !set.has(labels[filterLevel][triple[column[filterLevel]]]))) {
+            continue;
+        }
+        const label = labels[level][triple[column[level]]];
+        if (!seen.has(label)) {
+            seen.add(label);
+            options.push({label: label, value: label});
+        }
+    }
+    if (reset) {
+        return [options, null];
+    }
+    return [options, (current || []).filter(value => seen.has(value))];
+}
+function resetTriggered() {
+    return dash_clientside.callback_context.triggered.some(t => t.prop_id.startsWith('reset-filters'));
+}
+"""
+
+SUBTHEME_OPTIONS_JS = """
+function(selectedThemes, nClicks, hierarchy, currentValue) {
+""" + _CASCADE_JS + """
+    return cascadeOptions(hierarchy, 'Subtheme', [['Theme', selectedThemes]], resetTriggered(), currentValue);
+}
+"""
+
+CATEGORY_OPTIONS_JS = """
+function(selectedThemes, selectedSubthemes, nClicks, hierarchy, currentValue) {
+""" + _CASCADE_JS + """
+    return cascadeOptions(hierarchy, 'Category',
+                          [['Theme', selectedThemes], ['Subtheme', selectedSubthemes]],
+                          resetTriggered(), currentValue);
+}
+"""
+
+def serialize_outputs(outputs):
+    """Converts figures to plain dicts so cached outputs skip Plotly on a hit."""
+    return tuple(o.to_plotly_json() if isinstance(o, go.Figure) else o for o in outputs)
+
 # This function will be used to register callbacks
-def register_callbacks(app):
+def register_callbacks(app, main_app):
     def get_data():
-        data, _, _, _, _, _ = load_data()
-        return data
+        # the dashboard runs on its own server; the database lives on the main app
+        return latest_read_model(main_app)
+
+    # Publish the read model's data version; unchanged versions trigger nothing downstream
+    @app.callback(
+        Output('data-version', 'data'),
+        Input('data-version-poll', 'n_intervals'),
+        State('data-version', 'data')
+    )
+    def poll_data_version(n_intervals, current_version):
+        version = get_data().version
+        return dash.no_update if version == current_version else version
+
+    # KPI cards follow the data version
+    @app.callback(
+        [Output('kpi-themes', 'children'),
+         Output('kpi-subthemes', 'children'),
+         Output('kpi-categories', 'children'),
+         Output('kpi-names', 'children')],
+        Input('data-version', 'data')
+    )
+    def update_kpis(data_version):
+        facts = get_data()
+        everything = facts.triple_mask()
+        return (f"{len(facts.present_labels('Theme', everything))}",
+                f"{len(facts.present_labels('Subtheme', everything))}",
+                f"{len(facts.present_labels('Category', everything))}",
+                f"{facts.name_count}")
 
     # Main chart update callback
     @app.callback(
@@ -285,19 +818,22 @@ def register_callbacks(app):
          Output('pie-chart', 'figure'),
          Output('treemap-chart', 'figure'),
          Output('sunburst-chart', 'figure'),
-         Output('data-table-container', 'children')],
+         Output('data-table-container', 'children'),
+         Output('chart-mode', 'data')],
         [
             Input('theme-dropdown', 'value'),
             Input('subtheme-dropdown', 'value'),
             Input('category-dropdown', 'value'),
-            Input('reset-filters', 'n_clicks')
+            Input('reset-filters', 'n_clicks'),
+            Input('data-version', 'data')
         ],
         [State('theme-dropdown', 'value'),
          State('subtheme-dropdown', 'value'),
-         State('category-dropdown', 'value')]
+         State('category-dropdown', 'value'),
+         State('chart-mode', 'data')]
     )
-    def update_charts(selected_themes, selected_subthemes, selected_categories, n_clicks, 
-                      theme_state, subtheme_state, category_state):
+    def update_charts(selected_themes, selected_subthemes, selected_categories, n_clicks, data_version,
+                      theme_state, subtheme_state, category_state, chart_mode):
         # Reset filters if button clicked
         ctx = dash.callback_context
         if ctx.triggered and 'reset-filters' in ctx.triggered[0]['prop_id']:
@@ -305,245 +841,64 @@ def register_callbacks(app):
             selected_subthemes = None
             selected_categories = None
             
-        # Start with full dataset
-        filtered_data = get_data()
-        
-        # Apply filters
-        if selected_themes:
-            filtered_data = filtered_data[filtered_data['Theme'].isin(selected_themes)]
-        if selected_subthemes:
-            filtered_data = filtered_data[filtered_data['Subtheme'].isin(selected_subthemes)]
-        if selected_categories:
-            filtered_data = filtered_data[filtered_data['Category'].isin(selected_categories)]
-            
-        if len(filtered_data) == 0:
-            # Create empty figures if no data
-            empty_message = "No data matches the selected filters. Try adjusting your selections."
-            empty_layout = go.Layout(
-                title=empty_message,
-                font={'size': 16},
-                xaxis={'visible': False},
-                yaxis={'visible': False},
-                plot_bgcolor=COLORS['light'],
-                paper_bgcolor=COLORS['background'],
-                height=350
-            )
-            
-            empty_fig = go.Figure(layout=empty_layout)
-            empty_table = html.Div([
-                html.P(empty_message, className='text-center text-muted py-5')
-            ])
-            
-            return empty_fig, empty_fig, empty_fig, empty_fig, empty_table
-
-        # ------------------- Bar Chart -------------------
-        bar_data = filtered_data.groupby('Category').size().reset_index(name='Count')
-        bar_data = bar_data.sort_values('Count', ascending=False).head(15)  # Top 15 for readability
-        
-        bar_fig = go.Figure()
-        bar_fig.add_trace(go.Bar(
-            x=bar_data['Category'],
-            y=bar_data['Count'],
-            marker_color=COLORS['primary'],
-            hovertemplate='<b>%{x}</b><br>Count: %{y}<extra></extra>'
-        ))
-        
-        bar_fig.update_layout(
-            title={
-                'text': f'Top {len(bar_data)} Categories by Name Count',
-                'y': 0.95,
-                'x': 0.5,
-                'xanchor': 'center',
-                'yanchor': 'top'
-            },
-            xaxis_title='',
-            yaxis_title='Number of Names',
-            xaxis={'tickangle': -45},
-            template='plotly_white',
-            height=400,
-            margin={'t': 80, 'l': 50, 'r': 20, 'b': 100}
+        facts = get_data()
+        key = (
+            frozenset(selected_themes or ()),
+            frozenset(selected_subthemes or ()),
+            frozenset(selected_categories or ()),
+            facts.version,
         )
-        
-        # ------------------- Pie Chart -------------------
-        pie_data = filtered_data.groupby('Theme').size().reset_index(name='Count')
-        
-        pie_fig = go.Figure()
-        pie_fig.add_trace(go.Pie(
-            labels=pie_data['Theme'],
-            values=pie_data['Count'],
-            hole=0.4,
-            textinfo='percent+label',
-            insidetextorientation='radial',
-            marker=dict(
-                colors=px.colors.qualitative.Pastel,
-                line=dict(color='white', width=2)
-            ),
-            hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>'
-        ))
-        
-        pie_fig.update_layout(
-            title={
-                'text': 'Name Distribution by Theme',
-                'y': 0.95,
-                'x': 0.5,
-                'xanchor': 'center',
-                'yanchor': 'top'
-            },
-            template='plotly_white',
-            legend_title_text='Themes',
-            height=400,
-            margin={'t': 80, 'l': 20, 'r': 20, 'b': 20}
-        )
-        
-        # ------------------- Treemap Chart (replacing heatmap) -------------------
-        # Group data for treemap
-        tree_data = filtered_data.groupby(['Theme', 'Subtheme', 'Category']).size().reset_index(name='Count')
-        
-        treemap_fig = px.treemap(
-            tree_data, 
-            path=['Theme', 'Subtheme', 'Category'], 
-            values='Count',
-            color='Count',
-            hover_data=['Count'],
-            color_continuous_scale='Blues',
-            color_continuous_midpoint=np.average(tree_data['Count'])
-        )
-        
-        treemap_fig.update_layout(
-            title={
-                'text': 'Category Hierarchy Tree Map',
-                'y': 0.95,
-                'x': 0.5,
-                'xanchor': 'center',
-                'yanchor': 'top'
-            },
-            template='plotly_white',
-            height=500,
-            margin={'t': 80, 'l': 20, 'r': 20, 'b': 20}
-        )
-        
-        # ------------------- Sunburst Chart -------------------
-        sunburst_fig = px.sunburst(
-            filtered_data, 
-            path=['Theme', 'Subtheme', 'Category'],
-            color_discrete_sequence=px.colors.qualitative.Pastel,
-            branchvalues='total'
-        )
-        
-        sunburst_fig.update_layout(
-            title={
-                'text': 'Hierarchical View of Categories',
-                'y': 0.95,
-                'x': 0.5,
-                'xanchor': 'center',
-                'yanchor': 'top'
-            },
-            template='plotly_white',
-            height=500,
-            margin={'t': 80, 'l': 20, 'r': 20, 'b': 20}
-        )
-        
-        # ------------------- Data Table -------------------
-        # Get summary statistics
-        summary = filtered_data.groupby(['Theme', 'Subtheme', 'Category']).agg(
-            Name_Count=pd.NamedAgg(column='Name', aggfunc='nunique')
-        ).reset_index().sort_values('Name_Count', ascending=False).head(10)
-        
-        # Create table for data overview
-        table = html.Table([
-            # Header
-            html.Thead(
-                html.Tr([
-                    html.Th('Theme', className='text-center'),
-                    html.Th('Subtheme', className='text-center'),
-                    html.Th('Category', className='text-center'),
-                    html.Th('Name Count', className='text-center')
-                ], className='table-light')
-            ),
-            # Body
-            html.Tbody([
-                html.Tr([
-                    html.Td(row['Theme']),
-                    html.Td(row['Subtheme']),
-                    html.Td(row['Category']),
-                    html.Td(row['Name_Count'], className='text-center')
-                ]) for _, row in summary.iterrows()
-            ])
-        ], className='table table-striped table-hover table-bordered')
-        
-        # Add a title above the table
-        table_section = html.Div([
-            html.H6('Top 10 Categories by Name Count', className='text-muted mb-3'),
-            table
-        ])
+        outputs = figure_cache.get_or_compute(key, lambda: serialize_outputs(
+            build_charts(facts, selected_themes, selected_subthemes, selected_categories)))
+        # Only the data changed: patch the figures already in the browser instead of resending them
+        mode = 'compact' if DASHBOARD_COMPACT_FIGURES and outputs[0]['data'] else None
+        if mode == 'compact' and chart_mode == 'compact':
+            return (*patch_outputs(outputs), dash.no_update)
+        return (*outputs, mode)
 
-        return bar_fig, pie_fig, treemap_fig, sunburst_fig, table_section
-
-    # Callback to update subtheme dropdown options based on selected themes
+    # Ship the hierarchy to the browser again whenever the data version moves
     @app.callback(
+        Output('hierarchy', 'data'),
+        Input('data-version', 'data')
+    )
+    def update_hierarchy_store(data_version):
+        return get_data().hierarchy_codes()
+
+    # Cascading dropdown options are computed in the browser from the hierarchy store
+    app.clientside_callback(
+        SUBTHEME_OPTIONS_JS,
         [Output('subtheme-dropdown', 'options'),
          Output('subtheme-dropdown', 'value')],
         [Input('theme-dropdown', 'value'),
-         Input('reset-filters', 'n_clicks')],
+         Input('reset-filters', 'n_clicks'),
+         Input('hierarchy', 'data')],
         [State('subtheme-dropdown', 'value')]
     )
-    def update_subtheme_options(selected_themes, n_clicks, current_value):
-        ctx = dash.callback_context
-        if ctx.triggered and 'reset-filters' in ctx.triggered[0]['prop_id']:
-            df = get_data()
-            subthemes = df['Subtheme'].unique()
-            return [{'label': sub, 'value': sub} for sub in subthemes], None
-            
-        df = get_data()
-        if selected_themes:
-            df = df[df['Theme'].isin(selected_themes)]
-            
-        subthemes = df['Subtheme'].unique()
-        options = [{'label': sub, 'value': sub} for sub in subthemes]
-            
-        # Keep only the valid values based on the current filter
-        filtered_values = []
-        if current_value:
-            filtered_values = [val for val in current_value if val in subthemes]
-            
-        return options, filtered_values
-
-    # Callback to update category dropdown options based on selected themes and subthemes
-    @app.callback(
+    app.clientside_callback(
+        CATEGORY_OPTIONS_JS,
         [Output('category-dropdown', 'options'),
          Output('category-dropdown', 'value')],
         [Input('theme-dropdown', 'value'),
          Input('subtheme-dropdown', 'value'),
-         Input('reset-filters', 'n_clicks')],
+         Input('reset-filters', 'n_clicks'),
+         Input('hierarchy', 'data')],
         [State('category-dropdown', 'value')]
     )
-    def update_category_options(selected_themes, selected_subthemes, n_clicks, current_value):
-        ctx = dash.callback_context
-        if ctx.triggered and 'reset-filters' in ctx.triggered[0]['prop_id']:
-            df = get_data()
-            categories = df['Category'].unique()
-            return [{'label': cat, 'value': cat} for cat in categories], None
-            
-        df = get_data()
-        if selected_themes:
-            df = df[df['Theme'].isin(selected_themes)]
-        if selected_subthemes:
-            df = df[df['Subtheme'].isin(selected_subthemes)]
-            
-        categories = df['Category'].unique()
-        options = [{'label': cat, 'value': cat} for cat in categories]
-        
-        # Keep only the valid values based on the current filter
-        filtered_values = []
-        if current_value:
-            filtered_values = [val for val in current_value if val in categories]
-            
-        return options, filtered_values
 
 # Function to get dash app
-def get_dash_app(server):
+def get_dash_app(main_app):
+    """Builds the dashboard on its own Flask server, for mounting under /dashboard.
+
+    The server's routes live at its root and the pages request them under
+    /dashboard/, so the caller mounts ``dash_app.server`` there (see
+    lazy_dashboard.py). Database reads run in ``main_app``'s context.
+    """
     global dash_app
     if dash_app is None:
+        server = Flask(__name__)
+        if REQUEST_METRICS:
+            # the main app's request hooks never see the requests this server handles
+            init_request_metrics(server, endpoint_prefix='dashboard:')
         # Add Bootstrap 5 CSS and JS
         external_stylesheets = [
             'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
@@ -557,7 +912,8 @@ def get_dash_app(server):
         dash_app = dash.Dash(
             __name__,
             server=server,
-            url_base_pathname='/dashboard/',
+            routes_pathname_prefix='/',
+            requests_pathname_prefix='/dashboard/',
             external_stylesheets=external_stylesheets,
             external_scripts=external_scripts,
             suppress_callback_exceptions=True
@@ -565,7 +921,8 @@ def get_dash_app(server):
         
         # Apply custom theme
         dash_app._theme = custom_theme
-        dash_app.layout = create_layout()
-        register_callbacks(dash_app)
+        dash_app.layout = lambda: create_layout(main_app)
+        register_callbacks(dash_app, main_app)
+        start_refresher(main_app)
         
     return dash_app
@@ -0,0 +1,96 @@
+"""
+Shared data version counter. Every write to the hierarchy or name associations
+bumps it, and in-process read caches (e.g. the dashboard read model) compare
+against it to decide whether to reload. The counter lives in the database so
+that a write served by one gunicorn worker invalidates the caches of all others.
+VersionedCache is that per-worker cache for one snapshot (the hierarchy index,
+the dashboard fact table, the name bitmaps).
+"""
+import threading
+import time
+from sqlalchemy import select, update
+
+from models import db, DataVersion
+from upsert import insert_ignore
+from config import DATA_VERSION_POLL_SECONDS
+
+VERSION_ROW_ID = 1
+
+_lock = threading.Lock()
+_state = {'version': None, 'checked_at': 0.0}
+
+def current_version(max_age=DATA_VERSION_POLL_SECONDS):
+    """Returns the shared data version, re-reading it at most every ``max_age`` seconds."""
+    now = time.monotonic()
+    with _lock:
+        if _state['version'] is not None and now - _state['checked_at'] < max_age:
+            return _state['version']
+    version = db.session.execute(
+        select(DataVersion.version).where(DataVersion.id == VERSION_ROW_ID)).scalar()
+    version = version or 0
+    with _lock:
+        _state['version'], _state['checked_at'] = version, now
+    return version
+
+class VersionedCache:
+    """Holds one snapshot built by ``builder(version)`` and rebuilds it, once per worker,
+    when the shared data version moves."""
+
+    def __init__(self, builder):
+        self._builder = builder
+        self._lock = threading.Lock()
+        self._entry = (None, None)  # (version, snapshot)
+
+    def get(self):
+        """Returns the snapshot for the current data version, rebuilding it when stale."""
+        version = current_version()
+        cached, snapshot = self._entry
+        if snapshot is None or cached != version:
+            with self._lock:
+                cached, snapshot = self._entry
+                if snapshot is None or cached != version:
+                    snapshot = self._builder(version)
+                    self._entry = (version, snapshot)
+        return snapshot
+
+    def peek(self):
+        """The last snapshot built, possibly stale; None before the first build."""
+        return self._entry[1]
+
+    def replace(self, current, version, updated):
+        """Installs ``updated`` as the snapshot for ``version`` if ``current`` is still the cached one."""
+        with self._lock:
+            if self._entry[1] is current:
+                self._entry = (version, updated)
+                return True
+        return False
+
+    def clear(self):
+        with self._lock:
+            self._entry = (None, None)
+
+def _update_version_row(version):
+    """Sets the version row to the ``version`` expression, first seeding the row if it is missing.
+
+    The seed is an insert-ignore, so two workers that both find no row cannot fail each other.
+    """
+    for _ in range(2):
+        result = db.session.execute(
+            update(DataVersion)
+            .where(DataVersion.id == VERSION_ROW_ID)
+            .values(version=version))
+        if result.rowcount:
+            return
+        insert_ignore(DataVersion, [{'id': VERSION_ROW_ID, 'version': 0}], ['id'])
+
+def bump_version():
+    """Increments the shared data version inside the caller's transaction."""
+    _update_version_row(DataVersion.version + 1)
+    # force the next current_version() call in this worker back to the database
+    with _lock:
+        _state['checked_at'] = 0.0
+
+def lock_version():
+    """Takes the data version row's write lock (a RESERVED lock on SQLite) until the caller's
+    transaction ends, so writers of name links and their rollups run one at a time."""
+    _update_version_row(DataVersion.version)
@@ -0,0 +1,75 @@
+"""
+In-memory index of the theme → subtheme → category → name-id hierarchy that
+backs the public /api endpoints. It is built with four flat queries and rebuilt
+only when the shared data version moves, so the cascading dropdowns on the
+front portal are answered without touching the database.
+"""
+from array import array
+from collections import defaultdict
+from sqlalchemy import select
+
+from models import db, Theme, Subtheme, Category, NameCategory
+from data_version import VersionedCache
+
+class HierarchyIndex:
+    """Snapshot of the hierarchy plus per-category name-id arrays for one data version."""
+
+    def __init__(self, version, themes, subthemes, categories, links):
+        self.version = version
+        self.etag = f"hierarchy-{version}"
+        self.themes = dict(themes)
+        self.subthemes = {}
+        self.categories = {}
+        self.subthemes_by_theme = defaultdict(list)
+        self.categories_by_subtheme = defaultdict(list)
+        self.category_names = defaultdict(lambda: array('i'))
+        for sub_id, theme_id, name in sorted(subthemes):
+            self.subthemes[sub_id] = (theme_id, name)
+            self.subthemes_by_theme[theme_id].append(sub_id)
+        for cat_id, sub_id, name in sorted(categories):
+            self.categories[cat_id] = (sub_id, name)
+            self.categories_by_subtheme[sub_id].append(cat_id)
+        for name_id, cat_id in sorted(links):
+            self.category_names[cat_id].append(name_id)
+
+    def path(self, category_id):
+        """Returns (theme, subtheme, category) names for a category, or None if unknown."""
+        entry = self.categories.get(category_id)
+        if entry is None:
+            return None
+        sub_id, category_name = entry
+        theme_id, subtheme_name = self.subthemes.get(sub_id, (None, None))
+        return self.themes.get(theme_id), subtheme_name, category_name
+
+    def subtheme_options(self, theme_id):
+        theme_name = self.themes.get(theme_id)
+        return [
+            {'id': sub_id, 'name': f"{theme_name} - {self.subthemes[sub_id][1]}"}
+            for sub_id in self.subthemes_by_theme.get(theme_id, [])
+        ]
+
+    def category_options(self, subtheme_id):
+        options = []
+        for cat_id in self.categories_by_subtheme.get(subtheme_id, []):
+            theme_name, subtheme_name, category_name = self.path(cat_id)
+            options.append({'id': cat_id, 'name': f"{theme_name} - {subtheme_name} - {category_name}"})
+        return options
+
+    def name_ids(self, category_id):
+        return self.category_names.get(category_id, array('i'))
+
+def build_hierarchy_index(version):
+    session = db.session
+    return HierarchyIndex(
+        version,
+        session.execute(select(Theme.id, Theme.name)).all(),
+        session.execute(select(Subtheme.id, Subtheme.theme_id, Subtheme.name)).all(),
+        session.execute(select(Category.id, Category.subtheme_id, Category.name)).all(),
+        session.execute(select(NameCategory.name_id, NameCategory.category_id)).all(),
+    )
+
+_cache = VersionedCache(build_hierarchy_index)
+
+def get_hierarchy():
+    """Returns the HierarchyIndex for the current data version, rebuilding it when stale."""
+    return _cache.get()
@@ -0,0 +1,53 @@
+"""
+Lazily mounted dashboard. Importing dashboard.py pulls in pandas, numpy and
+plotly, and building it reads the database, so web workers that only serve the
+portal and /api routes never should. LazyDashboard is a WSGI app mounted at
+/dashboard that builds the Dash app on its first request, or ahead of time in
+a background warm-up thread that also loads the dashboard's read model.
+"""
+import logging
+import sys
+import threading
+
+class LazyDashboard:
+    """WSGI app that builds the Dash dashboard on first use."""
+
+    def __init__(self, main_app):
+        self.main_app = main_app
+        self._wsgi_app = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._wsgi_app is not None
+
+    def load(self):
+        if self._wsgi_app is None:
+            with self._lock:
+                if self._wsgi_app is None:
+                    logging.info("Importing and initializing Dash app...")
+                    from dashboard import get_dash_app
+                    self._wsgi_app = get_dash_app(self.main_app).server.wsgi_app
+                    logging.info("Dash app initialized.")
+        return self._wsgi_app
+
+    def warm_up(self):
+        """Builds the dashboard and loads its read model in a daemon thread so the first visitor does not wait."""
+        def run():
+            try:
+                self.load()
+                # the refresher only reloads after its first interval, so prime the fact table here
+                from dashboard import get_read_model
+                with self.main_app.app_context():
+                    get_read_model()
+            except Exception as e:
+                logging.error(f"Error during Dash app warm-up: {e}", exc_info=True)
+        threading.Thread(target=run, name='dashboard-warm-up', daemon=True).start()
+
+    def figure_cache_stats(self):
+        """The dashboard figure cache stats, or None until the dashboard is loaded."""
+        dashboard = sys.modules.get('dashboard')
+        return dashboard.figure_cache.stats() if self.loaded and dashboard else None
+
+    def __call__(self, environ, start_response):
+        return self.load()(environ, start_response)
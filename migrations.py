@@ -0,0 +1,103 @@
+"""
+Schema upgrades that db.create_all() cannot do on an existing database: it
+creates missing tables but never adds indexes to tables that already exist.
+upgrade_schema() first merges duplicate subthemes and categories, which
+would otherwise block the unique hierarchy indexes. It then creates every
+declared index that is missing.
+
+The app runs upgrade_schema() on every start (app.create_tables), which replaces
+the old cleanup_subthemes.py script: once the unique indexes exist, duplicate
+subthemes and categories can no longer be written.
+"""
+import logging
+import warnings
+from sqlalchemy import exc, func, inspect, select, update, delete, insert, exists, text
+from sqlalchemy.orm import aliased
+
+from models import db, Subtheme, Category, NameCategory
+from rollups import rebuild_rollups
+
+def _duplicate_groups(model, parent_column):
+    """Yields (keep_id, [duplicate ids]) per (parent, name) group; the lowest id is kept."""
+    groups = db.session.execute(
+        select(parent_column, model.name)
+        .group_by(parent_column, model.name)
+        .having(func.count(model.id) > 1)
+    ).all()
+    for parent_id, name in groups:
+        ids = db.session.execute(
+            select(model.id)
+            .where(parent_column == parent_id, model.name == name)
+            .order_by(model.id)
+        ).scalars().all()
+        yield ids[0], ids[1:]
+
+def dedupe_subthemes():
+    """Merges subthemes sharing (theme_id, name), re-pointing their categories. Returns rows removed."""
+    removed = 0
+    for keep_id, dupes in _duplicate_groups(Subtheme, Subtheme.theme_id):
+        db.session.execute(
+            update(Category).where(Category.subtheme_id.in_(dupes)).values(subtheme_id=keep_id))
+        db.session.execute(delete(Subtheme).where(Subtheme.id.in_(dupes)))
+        removed += len(dupes)
+    return removed
+
+def dedupe_categories():
+    """Merges categories sharing (subtheme_id, name), moving their name links. Returns rows removed."""
+    removed = 0
+    other = aliased(NameCategory)
+    for keep_id, dupes in _duplicate_groups(Category, Category.subtheme_id):
+        # copy links the kept category does not have yet, then drop the duplicates' links
+        db.session.execute(insert(NameCategory).from_select(
+            ['name_id', 'category_id'],
+            select(NameCategory.name_id, db.literal(keep_id))
+            .where(NameCategory.category_id.in_(dupes))
+            .where(~exists().where(other.name_id == NameCategory.name_id, other.category_id == keep_id))
+            .distinct()
+        ))
+        db.session.execute(delete(NameCategory).where(NameCategory.category_id.in_(dupes)))
+        db.session.execute(delete(Category).where(Category.id.in_(dupes)))
+        removed += len(dupes)
+    return removed
+
+def _index_names(inspector, table_name):
+    """Names of the indexes on ``table_name``, including expression indexes the inspector skips."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', exc.SAWarning)
+        names = {index['name'] for index in inspector.get_indexes(table_name)}
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite does not reflect expression indexes, so read them from the catalog
+        names.update(db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+            {'table': table_name}).scalars())
+    return names
+
+def upgrade_schema():
+    """Dedupes the hierarchy and creates missing declared indexes. Needs an app context."""
+    inspector = inspect(db.engine)
+    missing = [
+        index
+        for table in db.metadata.sorted_tables
+        if inspector.has_table(table.name)
+        for index in table.indexes
+        if index.name not in _index_names(inspector, table.name)
+    ]
+    if not missing:
+        return
+    if any(index.unique for index in missing):
+        # subthemes first: merging them can turn their categories into duplicates
+        subthemes, categories = dedupe_subthemes(), dedupe_categories()
+        if subthemes or categories:
+            rebuild_rollups()  # links moved between nodes
+        db.session.commit()
+        logging.info(f"Deduplicated hierarchy: {subthemes} subtheme(s), {categories} category(ies) merged.")
+    for index in missing:
+        try:
+            index.create(db.engine)  # a no-op for indexes whose ddl_if excludes this dialect
+        except exc.DatabaseError:
+            # another worker booting alongside may have created it since the catalog was read
+            if index.name not in _index_names(inspect(db.engine), index.table.name):
+                raise
+    # one log line per name: some indexes are declared once per dialect under a shared name
+    for table_name, index_name in sorted({(index.table.name, index.name) for index in missing}):
+        logging.info(f"Created index {index_name} on {table_name}.")
@@ -17,6 +17,10 @@ class Subtheme(db.Model):
     theme_id = db.Column(db.Integer, db.ForeignKey('themes.id'))
     name = db.Column(db.String(255))
     categories = db.relationship('Category', backref='subtheme')
+    __table_args__ = (
+        # also serves every theme_id lookup (leading column)
+        db.Index('uq_subthemes_theme_id_name', 'theme_id', 'name', unique=True),
+    )
 
 class Category(db.Model):
     __tablename__ = 'categories'
@@ -24,14 +28,53 @@ class Category(db.Model):
     subtheme_id = db.Column(db.Integer, db.ForeignKey('subthemes.id'))
     name = db.Column(db.String(255))
     names = db.relationship('Name', secondary='name_categories', back_populates='categories')
+    __table_args__ = (
+        # also serves every subtheme_id lookup (leading column)
+        db.Index('uq_categories_subtheme_id_name', 'subtheme_id', 'name', unique=True),
+    )
 
 class Name(db.Model):
     __tablename__ = 'names'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), unique=True)
     categories = db.relationship('Category', secondary='name_categories', back_populates='names')
+    __table_args__ = (
+        # case-insensitive prefix search for the admin matrix (pattern ops let Postgres use it for LIKE 'q%');
+        # postgresql_ops needs the labelled expression, which drops the double parentheses MySQL requires,
+        # so every other dialect gets the plain lower(name) index under the same name
+        db.Index('ix_names_name_lower', db.func.lower(name).label('name_lower'),
+                 postgresql_ops={'name_lower': 'text_pattern_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_names_name_lower', db.func.lower(name)).ddl_if(
+            callable_=lambda ddl, target, bind, **kw: kw['dialect'].name != 'postgresql'),
+    )
 
 class NameCategory(db.Model):
     __tablename__ = 'name_categories'
     name_id = db.Column(db.Integer, db.ForeignKey('names.id'), primary_key=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    __table_args__ = (
+        # the primary key covers name_id lookups; this covers category -> names
+        db.Index('ix_name_categories_category_id_name_id', 'category_id', 'name_id'),
+    )
+
+class ImportManifest(db.Model):
+    __tablename__ = 'import_manifests'
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(255), unique=True)
+    content_hash = db.Column(db.String(64))
+    mtime = db.Column(db.Float)
+    size = db.Column(db.BigInteger)
+    imported_at = db.Column(db.DateTime)
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+class HierarchyRollup(db.Model):
+    __tablename__ = 'hierarchy_rollups'
+    # 'category', 'subtheme', 'theme' or 'total' (node_id 0); maintained by rollups.py
+    level = db.Column(db.String(16), primary_key=True)
+    node_id = db.Column(db.Integer, primary_key=True)
+    link_count = db.Column(db.Integer, nullable=False, default=0)
+    name_count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,170 @@
+"""
+In-memory bitmap index of name → category membership for boolean set queries
+such as "names in categories A and B but not C". Names get dense positions in
+id order; every category holds a NumPy packed bitmap over those positions, and
+every subtheme and theme holds the precomputed OR of its categories' bitmaps.
+
+Like the HierarchyIndex, a snapshot belongs to one data version and is rebuilt
+when the shared version moves. A worker that commits a toggle-only admin batch
+instead moves its own snapshot forward with apply_toggles(), copying only the
+bitmaps of the categories it touched.
+"""
+import copy
+import numpy as np
+from sqlalchemy import select
+
+from models import db, Name, Subtheme, Category, NameCategory
+from data_version import VersionedCache, current_version
+
+LEVELS = ('category', 'subtheme', 'theme')
+
+class NameBitmapIndex:
+    """Packed per-category membership bitmaps over all names for one data version."""
+
+    def __init__(self, version, names, subthemes, categories, links):
+        self.version = version
+        self.etag = f"names-{version}"
+        names = sorted(names)
+        self.name_ids = np.fromiter((name_id for name_id, _ in names), dtype=np.int64, count=len(names))
+        self.names = [name for _, name in names]
+        self.size = len(names)
+        self.theme_of = dict(subthemes)
+        self.subtheme_of = dict(categories)
+        self.categories_by_subtheme = {}
+        self.subthemes_by_theme = {}
+        for sub_id, theme_id in self.theme_of.items():
+            self.subthemes_by_theme.setdefault(theme_id, []).append(sub_id)
+        for cat_id, sub_id in self.subtheme_of.items():
+            self.categories_by_subtheme.setdefault(sub_id, []).append(cat_id)
+
+        # every name is in the universe NOT is taken against; the pad bits of the last byte are not
+        self.universe = np.packbits(np.ones(self.size, dtype=bool))
+        self.bitmaps = {}
+        links = np.array(links, dtype=np.int64).reshape(-1, 2)
+        positions = np.searchsorted(self.name_ids, links[:, 0])
+        known = positions < self.size
+        known[known] = self.name_ids[positions[known]] == links[known, 0]
+        positions, link_categories = positions[known], links[known, 1]
+        order = np.argsort(link_categories, kind='stable')
+        category_ids, starts = np.unique(link_categories[order], return_index=True)
+        for cat_id, members in zip(category_ids, np.split(positions[order], starts[1:])):
+            bits = np.zeros(self.size, dtype=bool)
+            bits[members] = True
+            self.bitmaps[int(cat_id)] = np.packbits(bits)
+        self.subtheme_bitmaps, self.theme_bitmaps = {}, {}
+        self._rollup(self.categories_by_subtheme, self.subthemes_by_theme)
+
+    def _union(self, bitmaps, ids):
+        result = self.empty()
+        for node_id in ids:
+            bits = bitmaps.get(node_id)
+            if bits is not None:
+                result |= bits
+        return result
+
+    def _rollup(self, subthemes, themes):
+        """Recomputes the bitmaps of the given subtheme and theme ids from the category bitmaps."""
+        for sub_id in subthemes:
+            self.subtheme_bitmaps[sub_id] = self._union(self.bitmaps, self.categories_by_subtheme.get(sub_id, ()))
+        for theme_id in themes:
+            self.theme_bitmaps[theme_id] = self._union(self.subtheme_bitmaps, self.subthemes_by_theme.get(theme_id, ()))
+
+    def position(self, name_id):
+        """Dense position of a name id, or None if the name is not indexed."""
+        position = int(np.searchsorted(self.name_ids, name_id))
+        if position < self.size and self.name_ids[position] == name_id:
+            return position
+        return None
+
+    def empty(self):
+        return np.zeros_like(self.universe)
+
+    def bitmap(self, level, node_id):
+        """Names linked to any category under the node; unknown nodes match nothing. Read-only."""
+        bitmaps = {'category': self.bitmaps, 'subtheme': self.subtheme_bitmaps, 'theme': self.theme_bitmaps}[level]
+        bits = bitmaps.get(node_id)
+        return self.empty() if bits is None else bits
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """Packed bitmap of the names matching every ``all_of`` term, at least one
+        ``any_of`` term (when given) and no ``none_of`` term; terms are (level, id)."""
+        result = self.universe.copy()
+        for term in all_of:
+            result &= self.bitmap(*term)
+        if any_of:
+            either = self.empty()
+            for term in any_of:
+                either |= self.bitmap(*term)
+            result &= either
+        for term in none_of:
+            result &= ~self.bitmap(*term)
+        return result
+
+    def count(self, bits):
+        return int(np.bitwise_count(bits).sum())
+
+    def page(self, bits, offset, limit):
+        """(id, name) of the matching names at ``offset``..``offset + limit`` in name id order."""
+        # running match counts per byte locate the page, so only its bytes are unpacked
+        seen = np.cumsum(np.bitwise_count(bits))
+        first = int(np.searchsorted(seen, offset, side='right'))
+        last = int(np.searchsorted(seen, offset + limit, side='left')) + 1
+        skipped = int(seen[first - 1]) if first else 0
+        positions = first * 8 + np.flatnonzero(np.unpackbits(bits[first:last]))
+        positions = positions[offset - skipped:offset - skipped + limit]
+        return [(int(self.name_ids[p]), self.names[p]) for p in positions]
+
+    def with_toggles(self, version, changes):
+        """A copy at ``version`` with the ordered ((name_id, category_id), checked) changes
+        applied, sharing every untouched bitmap; None if a change names an unindexed name."""
+        bitmaps = dict(self.bitmaps)
+        copied = set()
+        for (name_id, category_id), checked in changes:
+            position = self.position(name_id)
+            if position is None:
+                return None
+            if category_id not in copied:
+                bitmaps[category_id] = bitmaps[category_id].copy() if category_id in bitmaps else self.empty()
+                copied.add(category_id)
+            if checked:
+                bitmaps[category_id][position >> 3] |= 0x80 >> (position & 7)
+            else:
+                bitmaps[category_id][position >> 3] &= ~np.uint8(0x80 >> (position & 7))
+        index = copy.copy(self)
+        index.version, index.etag, index.bitmaps = version, f"names-{version}", bitmaps
+        index.subtheme_bitmaps, index.theme_bitmaps = dict(self.subtheme_bitmaps), dict(self.theme_bitmaps)
+        subthemes = {self.subtheme_of[cat_id] for cat_id in copied if cat_id in self.subtheme_of}
+        index._rollup(subthemes, {self.theme_of[sub_id] for sub_id in subthemes if sub_id in self.theme_of})
+        return index
+
+def build_name_bitmaps(version):
+    session = db.session
+    return NameBitmapIndex(
+        version,
+        session.execute(select(Name.id, Name.name)).all(),
+        session.execute(select(Subtheme.id, Subtheme.theme_id)).all(),
+        session.execute(select(Category.id, Category.subtheme_id)).all(),
+        session.execute(select(NameCategory.name_id, NameCategory.category_id)).all(),
+    )
+
+_cache = VersionedCache(build_name_bitmaps)
+
+def get_name_bitmaps():
+    """Returns the NameBitmapIndex for the current data version, rebuilding it when stale."""
+    return _cache.get()
+
+def apply_toggles(changes):
+    """Moves this worker's index past a just-committed batch of toggle ``changes``.
+
+    Only safe when that batch is the one write since the index was built, i.e. the
+    shared version is exactly one ahead; otherwise the next query rebuilds.
+    """
+    index = _cache.peek()
+    if index is None:
+        return
+    version = current_version()
+    if version != index.version + 1:
+        return
+    updated = index.with_toggles(version, changes)
+    if updated is not None:
+        _cache.replace(index, version, updated)
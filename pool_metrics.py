@@ -0,0 +1,50 @@
+"""
+Connection pool instrumentation. InstrumentedQueuePool records how long each
+checkout waits for a connection (including opening overflow connections), and
+pool_stats() reports those counters together with the pool's live gauges.
+"""
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+_lock = threading.Lock()
+_counters = {
+    'checkouts': 0,
+    'timeouts': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0,
+}
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that counts checkouts and times the wait for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            with _lock:
+                _counters['timeouts'] += 1
+            raise
+        waited = time.perf_counter() - start
+        with _lock:
+            _counters['checkouts'] += 1
+            _counters['wait_seconds_total'] += waited
+            _counters['wait_seconds_max'] = max(_counters['wait_seconds_max'], waited)
+        return record
+
+def pool_stats(engine):
+    """Returns live pool gauges plus cumulative checkout/wait counters for ``engine``."""
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__}
+    for gauge in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, gauge, None)
+        if callable(method):
+            stats[gauge] = method()
+    with _lock:
+        stats.update(_counters)
+    stats['wait_seconds_avg'] = (
+        stats['wait_seconds_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    )
+    return stats
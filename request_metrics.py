@@ -0,0 +1,154 @@
+"""
+Opt-in request instrumentation. init_request_metrics() times every request per
+Flask endpoint and, through SQLAlchemy cursor events, counts the SQL statements
+each request issues and the time spent in the database. render_prometheus()
+formats those series, plus the pool and figure cache stats, in the Prometheus
+text exposition format for /_metrics.
+"""
+import contextvars
+import functools
+import threading
+import time
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PREFIX = 'toolset'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# statements per request; a route drifting into the upper buckets is an N+1 suspect
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+_lock = threading.Lock()
+_endpoints = {}
+# the current request's SQL counters; a context variable rather than g, because the dashboard
+# runs its queries inside the main app's context while serving its own server's request
+_request_sql = contextvars.ContextVar('request_sql', default=None)
+
+def _new_histogram(buckets):
+    return {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+
+def _observe(histogram, bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            histogram['buckets'][i] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the statement's own execution context: a statement that fails never reaches
+    # after_cursor_execute, so per-connection state would leak onto the pooled connection
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    # statements outside a request (startup import, CLI, background threads) are not attributed
+    counters = _request_sql.get()
+    if counters is not None:
+        counters['statements'] += 1
+        counters['db_seconds'] += elapsed
+
+def _start_request():
+    g.request_start = time.perf_counter()
+    g.request_sql = {'statements': 0, 'db_seconds': 0.0}
+    _request_sql.set(g.request_sql)
+
+def _record_request(exc, endpoint_prefix=''):
+    if 'request_start' not in g:
+        return
+    _request_sql.set(None)
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = endpoint_prefix + (request.endpoint or 'unmatched')
+    with _lock:
+        stats = _endpoints.setdefault(endpoint, {
+            'latency': _new_histogram(LATENCY_BUCKETS),
+            'statements': _new_histogram(STATEMENT_BUCKETS),
+            'db_seconds': 0.0,
+            'errors': 0,
+        })
+        _observe(stats['latency'], LATENCY_BUCKETS, elapsed)
+        _observe(stats['statements'], STATEMENT_BUCKETS, g.request_sql['statements'])
+        stats['db_seconds'] += g.request_sql['db_seconds']
+        # streamed responses (the admin page) tear down with GeneratorExit once closed
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            stats['errors'] += 1
+
+def init_request_metrics(app, endpoint_prefix=''):
+    """Registers the request hooks on ``app`` and the cursor events on every engine.
+
+    ``endpoint_prefix`` keeps the endpoints of another server sharing these series
+    (the dashboard mounted under /dashboard) apart from the main app's.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    # teardown runs even when the view raised, so failed requests are timed too
+    app.teardown_request(functools.partial(_record_request, endpoint_prefix=endpoint_prefix))
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _histogram_lines(name, bounds, endpoint, histogram):
+    labels = f'endpoint="{_label(endpoint)}"'
+    for bound, count in zip(bounds, histogram['buckets']):
+        yield f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+    yield f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}'
+    yield f'{name}_sum{{{labels}}} {histogram["sum"]}'
+    yield f'{name}_count{{{labels}}} {histogram["count"]}'
+
+def render_prometheus(pool=None, figure_cache=None):
+    """Returns the request series plus ``pool`` (pool_stats) and ``figure_cache`` (TTLCache.stats) as text."""
+    with _lock:
+        endpoints = {
+            endpoint: {
+                'latency': dict(stats['latency'], buckets=list(stats['latency']['buckets'])),
+                'statements': dict(stats['statements'], buckets=list(stats['statements']['buckets'])),
+                'db_seconds': stats['db_seconds'],
+                'errors': stats['errors'],
+            }
+            for endpoint, stats in _endpoints.items()
+        }
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+        return f'{PREFIX}_{name}'
+
+    name = family('request_duration_seconds', 'histogram', 'Request latency by Flask endpoint.')
+    for endpoint, stats in sorted(endpoints.items()):
+        lines.extend(_histogram_lines(name, LATENCY_BUCKETS, endpoint, stats['latency']))
+    name = family('request_sql_statements', 'histogram', 'SQL statements issued per request.')
+    for endpoint, stats in sorted(endpoints.items()):
+        lines.extend(_histogram_lines(name, STATEMENT_BUCKETS, endpoint, stats['statements']))
+    name = family('request_db_seconds_total', 'counter', 'Time spent executing SQL, by endpoint.')
+    for endpoint, stats in sorted(endpoints.items()):
+        lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} {stats["db_seconds"]}')
+    name = family('request_errors_total', 'counter', 'Requests that raised, by endpoint.')
+    for endpoint, stats in sorted(endpoints.items()):
+        lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} {stats["errors"]}')
+
+    if pool is not None:
+        for key, kind, help_text in (
+                ('checkouts', 'counter', 'Connection pool checkouts.'),
+                ('timeouts', 'counter', 'Connection pool checkout timeouts.'),
+                ('wait_seconds_total', 'counter', 'Time spent waiting for a pooled connection.'),
+                ('wait_seconds_max', 'gauge', 'Longest wait for a pooled connection.'),
+                ('size', 'gauge', 'Configured pool size.'),
+                ('checkedin', 'gauge', 'Idle connections in the pool.'),
+                ('checkedout', 'gauge', 'Connections in use.'),
+                ('overflow', 'gauge', 'Overflow connections currently open.')):
+            if key in pool:
+                suffix = '_total' if kind == 'counter' and not key.endswith('_total') else ''
+                lines.append(f'{family(f"pool_{key}{suffix}", kind, help_text)} {pool[key]}')
+
+    if figure_cache is not None:
+        for key, kind, help_text in (
+                ('hits', 'counter', 'Dashboard figure cache hits.'),
+                ('misses', 'counter', 'Dashboard figure cache misses.'),
+                ('size', 'gauge', 'Cached dashboard filter selections.'),
+                ('maxsize', 'gauge', 'Dashboard figure cache capacity.')):
+            suffix = '_total' if kind == 'counter' else ''
+            lines.append(f'{family(f"figure_cache_{key}{suffix}", kind, help_text)} {figure_cache[key]}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,127 @@
+"""
+Maintained link and distinct-name counts per hierarchy node, so the dashboard
+reads O(categories) rollup rows instead of every name_categories row.
+
+Every writer of name_categories keeps the rollups in step inside its own
+transaction: take a RollupSnapshot of the affected names before changing their
+links, then pass it to update_rollups() with the pairs its statements actually
+added and removed (INSERT/DELETE ... RETURNING, see upsert.py). Link counts move
+by the pair deltas; distinct-name counts move by comparing the names'
+subtheme/theme memberships before and after. A category's name count always
+equals its link count. Taking the snapshot locks the data version row, so
+concurrent writers queue behind each other instead of both counting a name as
+new to a subtheme.
+"""
+from sqlalchemy import delete, func, insert, select, update
+
+from models import db, Category, Subtheme, NameCategory, HierarchyRollup
+from data_version import lock_version
+from batching import chunked
+
+TOTAL_NODE = 0
+# what INSERT/DELETE ... RETURNING hands back for update_rollups()
+LINK_COLUMNS = (NameCategory.name_id, NameCategory.category_id)
+
+def _memberships(name_ids):
+    """(level, node_id, name_id) for every subtheme, theme and total a name is linked under."""
+    memberships = set()
+    for chunk in chunked(name_ids):
+        rows = db.session.execute(
+            select(NameCategory.name_id, Subtheme.id, Subtheme.theme_id)
+            .join(Category, Category.id == NameCategory.category_id)
+            .join(Subtheme, Subtheme.id == Category.subtheme_id)
+            .where(NameCategory.name_id.in_(chunk))
+            .distinct())
+        for name_id, subtheme_id, theme_id in rows:
+            memberships.update((('subtheme', subtheme_id, name_id),
+                                ('theme', theme_id, name_id),
+                                ('total', TOTAL_NODE, name_id)))
+    return memberships
+
+class RollupSnapshot:
+    """The hierarchy memberships of some names, captured before their links change.
+
+    Holds the data version lock from here to the end of the transaction.
+    """
+
+    def __init__(self, name_ids):
+        lock_version()
+        self.name_ids = set(name_ids)
+        self.memberships = _memberships(self.name_ids)
+
+def update_rollups(snapshot, added=(), removed=()):
+    """Applies the (name_id, category_id) pairs ``added`` and ``removed`` since ``snapshot``."""
+    added, removed = list(added), list(removed)
+    if not added and not removed:
+        return
+    parents = {}
+    for chunk in chunked({category_id for _, category_id in added + removed}):
+        parents.update((category_id, (subtheme_id, theme_id)) for category_id, subtheme_id, theme_id in
+                       db.session.execute(
+                           select(Category.id, Category.subtheme_id, Subtheme.theme_id)
+                           .join(Subtheme, Subtheme.id == Category.subtheme_id)
+                           .where(Category.id.in_(chunk))))
+
+    # (level, node_id) → [link delta, name delta]
+    deltas = {}
+    for pairs, sign in ((added, 1), (removed, -1)):
+        for _, category_id in pairs:
+            if category_id not in parents:
+                continue  # outside a complete hierarchy, like the dashboard
+            subtheme_id, theme_id = parents[category_id]
+            for node in (('category', category_id), ('subtheme', subtheme_id),
+                         ('theme', theme_id), ('total', TOTAL_NODE)):
+                deltas.setdefault(node, [0, 0])[0] += sign
+            deltas[('category', category_id)][1] += sign
+    after = _memberships(snapshot.name_ids)
+    for memberships, sign in ((after - snapshot.memberships, 1), (snapshot.memberships - after, -1)):
+        for level, node_id, _ in memberships:
+            deltas.setdefault((level, node_id), [0, 0])[1] += sign
+
+    for (level, node_id), (links, names) in deltas.items():
+        if not links and not names:
+            continue
+        result = db.session.execute(
+            update(HierarchyRollup)
+            .where(HierarchyRollup.level == level, HierarchyRollup.node_id == node_id)
+            .values(link_count=HierarchyRollup.link_count + links,
+                    name_count=HierarchyRollup.name_count + names))
+        if result.rowcount == 0:
+            db.session.execute(insert(HierarchyRollup).values(
+                level=level, node_id=node_id, link_count=links, name_count=names))
+    db.session.execute(delete(HierarchyRollup).where(HierarchyRollup.link_count <= 0))
+
+def rebuild_rollups():
+    """Recomputes every rollup row from name_categories. Returns the number of rows written."""
+    links = (select(NameCategory.name_id, NameCategory.category_id,
+                    Category.subtheme_id, Subtheme.theme_id)
+             .join(Category, Category.id == NameCategory.category_id)
+             .join(Subtheme, Subtheme.id == Category.subtheme_id)
+             .subquery())
+    rows = []
+    for level, column in (('category', links.c.category_id), ('subtheme', links.c.subtheme_id),
+                          ('theme', links.c.theme_id)):
+        rows.extend(
+            {'level': level, 'node_id': node_id, 'link_count': link_count, 'name_count': name_count}
+            for node_id, link_count, name_count in db.session.execute(
+                select(column, func.count(), func.count(links.c.name_id.distinct())).group_by(column)))
+    link_count, name_count = db.session.execute(
+        select(func.count(), func.count(links.c.name_id.distinct())).select_from(links)).one()
+    if link_count:
+        rows.append({'level': 'total', 'node_id': TOTAL_NODE,
+                     'link_count': link_count, 'name_count': name_count})
+
+    db.session.execute(delete(HierarchyRollup))
+    for chunk in chunked(rows):
+        db.session.execute(insert(HierarchyRollup), chunk)
+    return len(rows)
+
+def ensure_rollups():
+    """Builds the rollups of a database that has links but no rollup rows yet (e.g. after an upgrade)."""
+    has_rollups = db.session.execute(select(HierarchyRollup.level).limit(1)).first()
+    has_links = db.session.execute(select(NameCategory.name_id).limit(1)).first()
+    if has_links and not has_rollups:
+        rows = rebuild_rollups()
+        db.session.commit()
+        return rows
+    return 0
@@ -1,134 +1,548 @@
-import pandas as pd
+import hashlib
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import delete, select, tuple_
 
 # Import your db object and models
-from models import db, Theme, Subtheme, Category, Name, NameCategory
+from models import db, Theme, Subtheme, Category, Name, NameCategory, ImportManifest
 from config import DATABASE_URL
+from data_version import bump_version
+from upsert import insert_ignore, delete_returning
+from batching import BATCH_SIZE, chunked
+from rollups import LINK_COLUMNS, RollupSnapshot, update_rollups
+
+# pandas and openpyxl are imported where a workbook is actually read, so
+# importing this module (as every web worker does) stays cheap
 
 def safe_str(val):
-    return str(val).strip() if not pd.isna(val) else ""
+    # None from openpyxl, NaN/NaT from pandas (the only values unequal to themselves)
+    return "" if val is None or val != val else str(val).strip()
+
+TOOLSET_PATH = 'tool_set.xlsx'
+STAT_KEYS = ('themes', 'subthemes', 'categories', 'names', 'name_categories')
+SYNC_KEYS = ('links_added', 'links_removed', 'links_unchanged', 'names_added',
+             'categories_added', 'names_pruned', 'categories_pruned', 'subthemes_pruned', 'themes_pruned')
+# unique key of each table, used as the ON CONFLICT target
+CONFLICT_COLUMNS = {
+    Theme: ['name'],
+    Subtheme: ['theme_id', 'name'],
+    Category: ['subtheme_id', 'name'],
+    Name: ['name'],
+    NameCategory: ['name_id', 'category_id'],
+}
+
+def read_toolset_matrix(path=TOOLSET_PATH, sheet_name=0):
+    """Parses the workbook into ordered category triples and (name, triple) pairs."""
+    import pandas as pd
+    df = pd.read_excel(
+        path,
+        sheet_name=sheet_name,
+        header=[0, 1, 2],
+        index_col=0,
+        engine='openpyxl'
+    )
+    # rename the column‐index levels for clarity
+    df.columns.names = ['theme', 'subtheme', 'category']
+    logging.debug(f"Sample (first 5 rows):\n{df.head()}")
+
+    triples = {}
+    pairs = set()
+    present = df.notna().to_numpy()
+    for col_idx, (theme_name, subtheme_name, category_name) in enumerate(df.columns):
+        triple = (safe_str(theme_name), safe_str(subtheme_name), safe_str(category_name))
+        if not all(triple):
+            continue
+        triples[triple] = None
+        # a non‐NA cell means the row‐index name belongs to this category
+        for row_index in df.index[present[:, col_idx]]:
+            name_str = safe_str(row_index)
+            if name_str:
+                pairs.add((name_str, triple))
+    return list(triples), pairs
+
+def _header_triples(theme_row, subtheme_row, category_row):
+    """Maps column index → (theme, subtheme, category) from the three header rows.
+
+    Blank theme and subtheme cells inherit the label to their left (a new theme
+    resets the subtheme), as pandas does for MultiIndex headers; columns with a
+    blank category are skipped.
+    """
+    width = max(len(theme_row), len(subtheme_row), len(category_row))
+    pad = lambda row: list(row) + [None] * (width - len(row))
+    theme_row, subtheme_row, category_row = pad(theme_row), pad(subtheme_row), pad(category_row)
+    columns = {}
+    theme = subtheme = ''
+    # column 0 holds the names
+    for col in range(1, width):
+        if safe_str(theme_row[col]):
+            theme, subtheme = safe_str(theme_row[col]), ''
+        if safe_str(subtheme_row[col]):
+            subtheme = safe_str(subtheme_row[col])
+        triple = (theme, subtheme, safe_str(category_row[col]))
+        if all(triple):
+            columns[col] = triple
+    return columns
+
+def stream_toolset_matrix(path=TOOLSET_PATH, sheet_name=0):
+    """Streams the workbook with openpyxl in read‐only mode.
+
+    Returns the ordered category triples, parsed once from the header rows, and a
+    generator of sparse (name, triple) pairs that reads the data rows lazily, so
+    memory stays bounded whatever the sheet size. The workbook is closed once the
+    generator is exhausted or closed.
+    """
+    import openpyxl
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = (workbook.worksheets[sheet_name] if isinstance(sheet_name, int)
+                 else workbook[sheet_name])
+        rows = sheet.iter_rows(values_only=True)
+        columns = _header_triples(*(next(rows, ()) for _ in range(3)))
+    except Exception:
+        workbook.close()
+        raise
+
+    def pairs():
+        try:
+            for row in rows:
+                name_str = safe_str(row[0]) if row else ''
+                if not name_str:
+                    continue
+                # a non‐empty cell means the name belongs to this category
+                for col, triple in columns.items():
+                    if col < len(row) and row[col] is not None:
+                        yield name_str, triple
+        finally:
+            workbook.close()
+
+    return list(dict.fromkeys(columns.values())), pairs()
+
+def workbook_sheets(path):
+    """Returns the sheet names of a workbook without loading its cells."""
+    import openpyxl
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+def parse_sheet(job):
+    """Parses one (path, sheet_name) job into (triples, pairs); runs in a worker process."""
+    path, sheet_name = job
+    triples, pairs = stream_toolset_matrix(path, sheet_name)
+    return triples, set(pairs)
+
+def parse_workbooks(paths, all_sheets=False, workers=None):
+    """Parses several workbooks (first sheet, or every sheet) into one merged matrix.
+
+    openpyxl parsing is CPU‐bound, so with more than one sheet the jobs run in a
+    ProcessPoolExecutor of ``workers`` processes (default: one per core). Returns
+    the ordered, deduplicated triples and the union of all (name, triple) pairs.
+    """
+    jobs = [(path, sheet) for path in paths
+            for sheet in (workbook_sheets(path) if all_sheets else [0])]
+    if len(jobs) == 1 or workers == 1:
+        results = map(parse_sheet, jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(parse_sheet, jobs))
+
+    triples, pairs = {}, set()
+    for (path, sheet), (job_triples, job_pairs) in zip(jobs, results):
+        logging.info(f"Parsed {path} [{sheet}]: {len(job_triples)} categories, {len(job_pairs)} associations.")
+        triples.update(dict.fromkeys(job_triples))
+        pairs |= job_pairs
+    return list(triples), pairs
+
+class BulkImporter:
+    """Resolves a parsed workbook against the database with set‐based reads and batched inserts."""
+
+    def __init__(self, session, batch_size=BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+        self.stats = {key: {'inserted': 0, 'skipped': 0} for key in STAT_KEYS}
+        self._name_ids = None
+        self._seen_names = set()
+
+    def _insert(self, model, rows):
+        # executemany → multi‐row INSERT batches; ON CONFLICT DO NOTHING lets
+        # workers importing concurrently skip rows another worker just wrote,
+        # and RETURNING counts only the rows this one wrote
+        return sum(len(insert_ignore(model, chunk, CONFLICT_COLUMNS[model], returning=(model.id,)))
+                   for chunk in chunked(rows, self.batch_size))
+
+    def _record(self, key, inserted, total):
+        self.stats[key]['inserted'] += inserted
+        self.stats[key]['skipped'] += total - inserted
+
+    def _load_hierarchy(self):
+        # duplicates may exist in older databases; the lowest id wins
+        themes, subthemes, categories = {}, {}, {}
+        for row in self.session.execute(select(Theme.id, Theme.name).order_by(Theme.id)):
+            themes.setdefault(row.name, row.id)
+        for row in self.session.execute(
+                select(Subtheme.id, Subtheme.theme_id, Subtheme.name).order_by(Subtheme.id)):
+            subthemes.setdefault((row.theme_id, row.name), row.id)
+        for row in self.session.execute(
+                select(Category.id, Category.subtheme_id, Category.name).order_by(Category.id)):
+            categories.setdefault((row.subtheme_id, row.name), row.id)
+        return themes, subthemes, categories
+
+    def resolve_categories(self, triples):
+        """Returns {(theme, subtheme, category): category_id}, inserting missing levels."""
+        themes, subthemes, categories = self._load_hierarchy()
+
+        wanted = list(dict.fromkeys(t for t, _, _ in triples))
+        missing = [t for t in wanted if t not in themes]
+        inserted = self._insert(Theme, [{'name': t} for t in missing])
+        self._record('themes', inserted, len(wanted))
+        if missing:
+            themes, subthemes, categories = self._load_hierarchy()
+
+        wanted = list(dict.fromkeys((themes[t], s) for t, s, _ in triples))
+        missing = [key for key in wanted if key not in subthemes]
+        inserted = self._insert(Subtheme, [{'theme_id': tid, 'name': s} for tid, s in missing])
+        self._record('subthemes', inserted, len(wanted))
+        if missing:
+            themes, subthemes, categories = self._load_hierarchy()
+
+        wanted = list(dict.fromkeys(
+            (subthemes[(themes[t], s)], c) for t, s, c in triples))
+        missing = [key for key in wanted if key not in categories]
+        inserted = self._insert(Category, [{'subtheme_id': sid, 'name': c} for sid, c in missing])
+        self._record('categories', inserted, len(wanted))
+        if missing:
+            themes, subthemes, categories = self._load_hierarchy()
+
+        return {
+            (t, s, c): categories[(subthemes[(themes[t], s)], c)]
+            for t, s, c in triples
+        }
+
+    def resolve_names(self, names):
+        """Returns the {name: name_id} lookup covering ``names``, inserting new ones.
+
+        Existing names are loaded once per importer, so repeated calls (one per
+        streamed batch) only query for the names they insert.
+        """
+        if self._name_ids is None:
+            self._name_ids = dict(self.session.execute(select(Name.name, Name.id)).all())
+        existing = self._name_ids
+        wanted = [n for n in dict.fromkeys(names) if n not in self._seen_names]
+        self._seen_names.update(wanted)
+        missing = [n for n in wanted if n not in existing]
+        inserted = self._insert(Name, [{'name': n} for n in missing])
+        self._record('names', inserted, len(wanted))
+        for chunk in chunked(missing, self.batch_size):
+            existing.update(self.session.execute(
+                select(Name.name, Name.id).where(Name.name.in_(chunk))).all())
+        return existing
+
+    def write_associations(self, id_pairs):
+        """Inserts (name_id, category_id) pairs that are not linked yet."""
+        id_pairs = set(id_pairs)
+        existing = set()
+        for chunk in chunked(id_pairs, self.batch_size):
+            existing.update(self.session.execute(
+                select(NameCategory.name_id, NameCategory.category_id)
+                .where(tuple_(NameCategory.name_id, NameCategory.category_id).in_(chunk))).all())
+        new_pairs = sorted(id_pairs - existing)
+        snapshot = RollupSnapshot(nid for nid, _ in new_pairs)
+        # a concurrent importer may have linked some of new_pairs since the lookup;
+        # only the rows this insert wrote count towards the rollups and the stats
+        inserted = []
+        for chunk in chunked(new_pairs, self.batch_size):
+            inserted.extend(insert_ignore(
+                NameCategory, [{'name_id': nid, 'category_id': cid} for nid, cid in chunk],
+                CONFLICT_COLUMNS[NameCategory], returning=LINK_COLUMNS))
+        update_rollups(snapshot, added=inserted)
+        self._record('name_categories', len(inserted), len(id_pairs))
+
+    def run(self, triples, pairs):
+        """Imports a parsed (triples, pairs) matrix and returns the insert/skip stats."""
+        category_ids = self.resolve_categories(triples)
+        name_ids = self.resolve_names(sorted({name for name, _ in pairs}))
+        self.write_associations(
+            (name_ids[name], category_ids[triple]) for name, triple in pairs)
+        return self.stats
+
+    def run_stream(self, triples, pairs):
+        """Imports an iterator of (name, triple) pairs in batches and returns the stats."""
+        category_ids = self.resolve_categories(triples)
+        for chunk in chunked(pairs, self.batch_size):
+            name_ids = self.resolve_names(name for name, _ in chunk)
+            self.write_associations(
+                (name_ids[name], category_ids[triple]) for name, triple in chunk)
+        return self.stats
+
+    def _current_links(self):
+        """Returns {(name, triple): (name_id, category_id)} for every stored link."""
+        rows = self.session.execute(
+            select(Name.name, Theme.name, Subtheme.name, Category.name,
+                   NameCategory.name_id, NameCategory.category_id)
+            .join(Name, Name.id == NameCategory.name_id)
+            .join(Category, Category.id == NameCategory.category_id)
+            .join(Subtheme, Subtheme.id == Category.subtheme_id)
+            .join(Theme, Theme.id == Subtheme.theme_id))
+        return {(name, (theme, subtheme, category)): (name_id, category_id)
+                for name, theme, subtheme, category, name_id, category_id in rows}
+
+    def sync(self, triples, pairs, dry_run=False, prune=False):
+        """Makes name_categories match the workbook, touching only the changed links.
+
+        The workbook's (name, triple) pairs are diffed against the stored links:
+        missing links are inserted (creating names and categories as needed) and
+        links absent from the workbook are deleted, both in chunks. With ``prune``,
+        names and hierarchy rows missing from the workbook are deleted too. With ``dry_run`` nothing is written. Returns a
+        summary dict keyed by SYNC_KEYS.
+        """
+        summary = dict.fromkeys(SYNC_KEYS, 0)
+        pairs = set(pairs)
+        current = self._current_links()
+        to_add = pairs - current.keys()
+        to_remove = [ids for pair, ids in current.items() if pair not in pairs]
+        summary['links_added'] = len(to_add)
+        summary['links_removed'] = len(to_remove)
+        summary['links_unchanged'] = len(pairs) - len(to_add)
+
+        if dry_run:
+            existing_names = set(self.session.execute(select(Name.name)).scalars())
+            summary['names_added'] = len({name for name, _ in to_add} - existing_names)
+            themes, subthemes, categories = self._load_hierarchy()
+            summary['categories_added'] = sum(
+                1 for t, s, c in triples
+                if (subthemes.get((themes.get(t), s)), c) not in categories)
+        else:
+            category_ids = self.resolve_categories(triples)
+            name_ids = self.resolve_names(sorted({name for name, _ in to_add}))
+            self.write_associations(
+                (name_ids[name], category_ids[triple]) for name, triple in to_add)
+            summary['links_added'] = self.stats['name_categories']['inserted']
+            summary['names_added'] = self.stats['names']['inserted']
+            summary['categories_added'] = self.stats['categories']['inserted']
+            snapshot = RollupSnapshot(name_id for name_id, _ in to_remove)
+            removed = []
+            for chunk in chunked(to_remove, self.batch_size):
+                removed.extend(delete_returning(
+                    NameCategory, tuple_(NameCategory.name_id, NameCategory.category_id).in_(chunk),
+                    LINK_COLUMNS))
+            update_rollups(snapshot, removed=removed)
+            summary['links_removed'] = len(removed)
+
+        if prune:
+            self._prune(triples, {name for name, _ in pairs}, summary, dry_run)
+        return summary
+
+    def _prune(self, triples, names, summary, dry_run):
+        # after the sync only workbook pairs stay linked, so anything the workbook
+        # lacks is an orphan; children are listed before parents for the deletes
+        wanted = set(triples)
+        kept_subthemes = {(t, s) for t, s, _ in wanted}
+        kept_themes = {t for t, _, _ in wanted}
+        orphans = {
+            Name: [name_id for name_id, name in self.session.execute(select(Name.id, Name.name))
+                   if name not in names],
+            Category: [row.id for row in self.session.execute(
+                select(Category.id, Theme.name.label('theme'), Subtheme.name.label('subtheme'), Category.name)
+                .join(Subtheme, Subtheme.id == Category.subtheme_id)
+                .join(Theme, Theme.id == Subtheme.theme_id))
+                if (row.theme, row.subtheme, row.name) not in wanted],
+            Subtheme: [row.id for row in self.session.execute(
+                select(Subtheme.id, Theme.name.label('theme'), Subtheme.name)
+                .join(Theme, Theme.id == Subtheme.theme_id))
+                if (row.theme, row.name) not in kept_subthemes],
+            Theme: [theme_id for theme_id, name in self.session.execute(select(Theme.id, Theme.name))
+                    if name not in kept_themes],
+        }
+        for model, key in ((Name, 'names_pruned'), (Category, 'categories_pruned'),
+                           (Subtheme, 'subthemes_pruned'), (Theme, 'themes_pruned')):
+            summary[key] = len(orphans[model])
+            if dry_run:
+                continue
+            for chunk in chunked(orphans[model], self.batch_size):
+                self.session.execute(delete(model).where(model.id.in_(chunk)))
+
+def format_stats(stats):
+    return ', '.join(
+        f"{key}: {counts['inserted']} inserted / {counts['skipped']} skipped"
+        for key, counts in stats.items()
+    )
+
+def format_sync_summary(summary):
+    return ', '.join(f"{key.replace('_', ' ')}: {count}" for key, count in summary.items())
+
+def workbook_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _manifest_is_current(manifest, path, stat):
+    """True when the manifest proves the workbook was already imported.
+
+    A matching mtime and size short‐circuits without reading the file; otherwise
+    the content hash decides, and a hash match just refreshes the stored mtime.
+    """
+    if manifest is None:
+        return False
+    if manifest.mtime == stat.st_mtime and manifest.size == stat.st_size:
+        return True
+    if manifest.content_hash == workbook_hash(path):
+        manifest.mtime, manifest.size = stat.st_mtime, stat.st_size
+        db.session.commit()
+        return True
+    return False
+
+def _record_manifest(manifest, source, path, stat):
+    if manifest is None:
+        # a worker importing concurrently may have recorded it while this one waited on the rollup lock
+        manifest = db.session.execute(
+            select(ImportManifest).filter_by(source=source)).scalar_one_or_none()
+    if manifest is None:
+        manifest = ImportManifest(source=source)
+        db.session.add(manifest)
+    manifest.content_hash = workbook_hash(path)
+    manifest.mtime, manifest.size = stat.st_mtime, stat.st_size
+    manifest.imported_at = datetime.now(timezone.utc)
+
+def populate_db_from_excel(app_instance, path=TOOLSET_PATH, force=False, stream=False):
+    """Reads data from tool_set.xlsx and bulk‐imports it into the database.
+
+    The import is skipped when the import manifest shows the workbook is
+    unchanged since the last run, unless ``force`` is set. With ``stream`` the
+    sheet is read row by row in openpyxl read‐only mode and written in batches
+    instead of being loaded as a dense DataFrame. Returns the per‐table
+    insert/skip stats, or None when the import was skipped or failed.
+    """
+    source = os.path.normpath(path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        logging.error(f"Error: {path} not found.")
+        return None
 
-def populate_db_from_excel(app_instance):
-    """Reads data from tool_set.xlsx and populates the database."""
-    logging.info("Starting database population from tool_set.xlsx…")
-    
     try:
         with app_instance.app_context():
-            logging.info("Reading tool_set.xlsx with 3 header rows…")
+            manifest = db.session.execute(
+                select(ImportManifest).filter_by(source=source)).scalar_one_or_none()
+            if not force and _manifest_is_current(manifest, path, stat):
+                logging.info(f"{path} unchanged since last import, skipping.")
+                return None
+
+            logging.info(f"Starting database population from {path}…")
+            logging.info(f"Reading {path} with 3 header rows…")
             try:
-                df = pd.read_excel(
-                    'tool_set.xlsx',
-                    sheet_name=0,
-                    header=[0, 1, 2],
-                    index_col=0,
-                    engine='openpyxl'
-                )
-                # rename the column‐index levels for clarity
-                df.columns.names = ['theme', 'subtheme', 'category']
-                logging.info("Excel file read successfully.")
-                logging.debug(f"Columns MultiIndex levels: {df.columns.names}")
-                logging.debug(f"Sample (first 5 rows):\n{df.head()}")
-            except FileNotFoundError:
-                logging.error("Error: tool_set.xlsx not found.")
-                return
+                if stream:
+                    triples, pairs = stream_toolset_matrix(path)
+                    logging.info(f"Streaming {path}: {len(triples)} categories.")
+                else:
+                    triples, pairs = read_toolset_matrix(path)
+                    logging.info(f"Excel file read successfully: {len(triples)} categories, {len(pairs)} associations.")
             except Exception as e:
-                logging.error("Error reading tool_set.xlsx", exc_info=True)
-                return
-
-            # caches to avoid re‐queries
-            themes_cache = {}
-            subthemes_cache = {}
-            categories_cache = {}
-            names_cache = {}
-
-            # process each (theme, subtheme, category) triple
-            for theme_name, subtheme_name, category_name in df.columns:
-                theme_key, subtheme_key = safe_str(theme_name), safe_str(subtheme_name)
-                category_key = safe_str(category_name)
-                if not (theme_key and subtheme_key and category_key):
-                    continue
+                logging.error(f"Error reading {path}", exc_info=True)
+                return None
 
-                # → Theme
-                theme = themes_cache.get(theme_key)
-                if not theme:
-                    theme = (db.session.query(Theme)
-                                    .filter_by(name=theme_key)
-                                    .first())
-                    if not theme:
-                        theme = Theme(name=theme_key)
-                        db.session.add(theme)
-                        db.session.flush()
-                    themes_cache[theme_key] = theme
-
-                # → Subtheme
-                st_key = (theme.id, subtheme_key)
-                subtheme = subthemes_cache.get(st_key)
-                if not subtheme:
-                    subtheme = (db.session.query(Subtheme)
-                                       .filter_by(theme_id=theme.id, name=subtheme_key)
-                                       .first())
-                    if not subtheme:
-                        subtheme = Subtheme(theme_id=theme.id, name=subtheme_key)
-                        db.session.add(subtheme)
-                        db.session.flush()
-                    subthemes_cache[st_key] = subtheme
-
-                # → Category
-                cat_key = (subtheme.id, category_key)
-                category = categories_cache.get(cat_key)
-                if not category:
-                    category = (db.session.query(Category)
-                                        .filter_by(subtheme_id=subtheme.id, name=category_key)
-                                        .first())
-                    if not category:
-                        category = Category(subtheme_id=subtheme.id, name=category_key)
-                        db.session.add(category)
-                        db.session.flush()
-                    categories_cache[cat_key] = category
-
-                # → Names & Associations
-                # iterate each row; if the cell is non‐NA, treat the row‐index as the name
-                series = df[(theme_name, subtheme_name, category_name)]
-                for row_index, cell_value in series.items():
-                    if pd.isna(cell_value):
-                        continue
-                    name_str = safe_str(row_index)
-                    if not name_str:
-                        continue
-
-                    # get or create Name
-                    name_obj = names_cache.get(name_str)
-                    if not name_obj:
-                        name_obj = (db.session.query(Name)
-                                         .filter_by(name=name_str)
-                                         .first())
-                        if not name_obj:
-                            name_obj = Name(name=name_str)
-                            db.session.add(name_obj)
-                            db.session.flush()
-                        names_cache[name_str] = name_obj
-
-                    # link Name ↔ Category
-                    exists = (db.session.query(NameCategory)
-                                     .filter_by(name_id=name_obj.id, category_id=category.id)
-                                     .first())
-                    if not exists:
-                        db.session.add(
-                            NameCategory(name_id=name_obj.id, category_id=category.id)
-                        )
+            importer = BulkImporter(db.session)
+            stats = importer.run_stream(triples, pairs) if stream else importer.run(triples, pairs)
+            _record_manifest(manifest, source, path, stat)
+            if any(counts['inserted'] for counts in stats.values()):
+                bump_version()
 
             # commit everything once
             logging.info("Committing to the database…")
             db.session.commit()
-            logging.info("Done populating database.")
+            logging.info(f"Done populating database. {format_stats(stats)}")
+            return stats
 
     except Exception as e:
         logging.error("Unexpected error during DB population", exc_info=True)
-        db.session.rollback()
+        with app_instance.app_context():
+            db.session.rollback()
+        return None
+
+def sync_db_from_excel(app_instance, path=TOOLSET_PATH, dry_run=False, prune=False, stream=False):
+    """Syncs the database to the workbook, applying only the changed links.
+
+    Unlike populate_db_from_excel this also deletes links (and, with ``prune``,
+    orphaned names and hierarchy rows) that the workbook no longer has, so an
+    edited workbook never needs a wipe‐and‐reload. With ``dry_run`` the diff is
+    only summarised. Returns the summary dict, or None when the sync failed.
+    """
+    source = os.path.normpath(path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        logging.error(f"Error: {path} not found.")
+        return None
+
+    try:
+        with app_instance.app_context():
+            logging.info(f"{'Dry‐run sync' if dry_run else 'Syncing'} database with {path}…")
+            triples, pairs = stream_toolset_matrix(path) if stream else read_toolset_matrix(path)
+            summary = BulkImporter(db.session).sync(triples, pairs, dry_run=dry_run, prune=prune)
+            logging.info(f"Sync summary{' (dry run)' if dry_run else ''}: {format_sync_summary(summary)}")
+            if dry_run:
+                db.session.rollback()
+                return summary
+
+            manifest = db.session.execute(
+                select(ImportManifest).filter_by(source=source)).scalar_one_or_none()
+            _record_manifest(manifest, source, path, stat)
+            if any(count for key, count in summary.items() if key != 'links_unchanged'):
+                bump_version()
+            db.session.commit()
+            return summary
+
+    except Exception as e:
+        logging.error("Unexpected error during DB sync", exc_info=True)
+        with app_instance.app_context():
+            db.session.rollback()
+        return None
+
+def import_workbooks(app_instance, paths, all_sheets=False, workers=None):
+    """Imports several workbooks, or all their sheets, in one pass.
+
+    Sheets are parsed in parallel (see parse_workbooks); the merged matrix is
+    then written once through a single BulkImporter, so the database only ever
+    sees one writer. Always imports, like ``force`` in populate_db_from_excel,
+    and records a manifest per workbook. Returns the stats, or None on failure.
+    """
+    try:
+        stats_by_path = {path: os.stat(path) for path in paths}
+    except FileNotFoundError as e:
+        logging.error(f"Error: {e.filename} not found.")
+        return None
+
+    try:
+        with app_instance.app_context():
+            logging.info(f"Parsing {len(paths)} workbook(s){' (all sheets)' if all_sheets else ''}…")
+            triples, pairs = parse_workbooks(paths, all_sheets=all_sheets, workers=workers)
+            logging.info(f"Merged matrix: {len(triples)} categories, {len(pairs)} associations.")
+
+            stats = BulkImporter(db.session).run(triples, pairs)
+            for path, stat in stats_by_path.items():
+                source = os.path.normpath(path)
+                manifest = db.session.execute(
+                    select(ImportManifest).filter_by(source=source)).scalar_one_or_none()
+                _record_manifest(manifest, source, path, stat)
+            if any(counts['inserted'] for counts in stats.values()):
+                bump_version()
+            db.session.commit()
+            logging.info(f"Done importing {len(paths)} workbook(s). {format_stats(stats)}")
+            return stats
+
+    except Exception as e:
+        logging.error("Unexpected error during multi-workbook import", exc_info=True)
+        with app_instance.app_context():
+            db.session.rollback()
+        return None
 
 if __name__ == '__main__':
     from app import app as flask_app
     logging.basicConfig(level=logging.INFO)
     print("Running as script…")
-    populate_db_from_excel(flask_app)
+    populate_db_from_excel(flask_app, force=True)
     print("Finished.")
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Dialect-aware INSERT ... ON CONFLICT DO NOTHING, so get-or-create paths and bulk
+imports rely on the unique indexes instead of check-then-insert races, plus a
+DELETE that reports the rows it removed. With RETURNING (PostgreSQL, SQLite >=
+3.35) callers learn exactly which rows their statement changed, even when a
+concurrent writer got to some of them first.
+"""
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db
+
+def _insert_ignore_stmt(model, conflict_columns, dialect):
+    if dialect == 'postgresql':
+        return postgresql_insert(model).on_conflict_do_nothing(index_elements=conflict_columns)
+    if dialect == 'sqlite':
+        return sqlite_insert(model).on_conflict_do_nothing(index_elements=conflict_columns)
+    if dialect in ('mysql', 'mariadb'):
+        return insert(model).prefix_with('IGNORE')
+    return insert(model)
+
+def insert_ignore(model, rows, conflict_columns, returning=None):
+    """Inserts ``rows`` (list of dicts), silently skipping those that hit a unique key.
+
+    Returns the driver rowcount, which is only reliable for a single row. With
+    ``returning`` columns, returns the column tuples of the rows actually inserted.
+    """
+    if not rows:
+        return [] if returning else 0
+    # Core execution on the session's connection, so the rowcount is available
+    connection = db.session.connection()
+    stmt = _insert_ignore_stmt(model, conflict_columns, connection.dialect.name)
+    if returning is None:
+        return connection.execute(stmt, rows[0] if len(rows) == 1 else rows).rowcount
+    if connection.dialect.insert_executemany_returning:
+        return [tuple(row) for row in connection.execute(stmt.returning(*returning), rows)]
+    # no RETURNING (MySQL): one row at a time, where the rowcount is reliable
+    return [tuple(row[column.key] for column in returning)
+            for row in rows if connection.execute(stmt, row).rowcount]
+
+def delete_returning(model, where, returning):
+    """Deletes the ``model`` rows matching ``where``; returns the ``returning`` column tuples of those deleted."""
+    connection = db.session.connection()
+    if connection.dialect.delete_returning:
+        return [tuple(row) for row in connection.execute(delete(model).where(where).returning(*returning))]
+    rows = [tuple(row) for row in connection.execute(select(*returning).where(where).with_for_update())]
+    connection.execute(delete(model).where(where))
+    return rows